@@ -0,0 +1,116 @@
+# Cold start of short-lived CLI processes: interpreter start, import of options, of a module with many option classes
+# and of a module with many suboption classes with variants, and a full parse_args() of script arguments,
+# each timed in a fresh subprocess.
+# run from the repository root:
+# $ python -m benchmarks.import_benchmark
+# $ python -m benchmarks.import_benchmark --classes 500 --runs 50 --json import.json
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from options import OptionsBase, option
+from benchmarks.utils import percentile, report
+
+
+class ImportBenchmarkOptions(OptionsBase):
+    classes: int = option(default=100, help="number of option classes in the generated module")
+    variant_classes: int = option(default=500, help="number of suboption classes in the generated module with variants")
+    variants: int = option(default=5000, help="number of variants of all suboption classes")
+    runs: int = option(default=20, help="number of subprocesses started per benchmark")
+    json: str = option(help="write results to this file")
+    baseline: str = option(help="compare results with this file")
+    max_regression: float = option(default=0.2, help="allowed relative growth against baseline")
+
+
+def module_source(n_classes: int) -> str:
+    """
+    Source of a module with n_classes option classes shaped like ExampleOptions, the last one is CliOptions
+    with a suboption field of the union of two method classes.
+    """
+    lines = ["from options import OptionsBase, option, variant", ""]
+    for name in ("MethodA", "MethodB"):
+        lines += [f"@variant('{name}1', aint=1)",
+                  f"class {name}(OptionsBase):",
+                  "    abool: bool = option(action='store_true')",
+                  "    aint: int = option()",
+                  "    astr: str = option()", ""]
+    for i in range(n_classes):
+        lines += [f"class Options{i}(OptionsBase):" if i < n_classes - 1 else "class CliOptions(OptionsBase):",
+                  "    test: bool = option('-t', action='store_true', help='Test only')",
+                  "    data: str = option(default='MNIST', help='dataset')",
+                  "    W: int = option('-W', default=3, help='quantization levels per weight')",
+                  "    net: str = option(default='net1', choices=['net1', 'net2'], help='nets')",
+                  "    lr: float = option(default=0.1)",
+                  "    method: MethodA | MethodB = option()", ""]
+    return "\n".join(lines)
+
+
+def variants_module_source(n_classes: int, n_variants: int, eager: bool) -> str:
+    """
+    Source of a module with n_classes suboption classes with n_variants variants in total.
+    """
+    lines = ["from options import OptionsBase, option, variant", ""]
+    if eager:
+        lines += ["OptionsBase.check_variants_eagerly = True", ""]
+    for i in range(n_classes):
+        for v in range(n_variants * (i + 1) // n_classes - n_variants * i // n_classes):
+            lines.append(f"@variant('M{i}V{v}', abool=True, aint={v}, astr='v{v}')")
+        lines += [f"class Method{i}(OptionsBase):",
+                  "    abool: bool = option(action='store_true')",
+                  "    aint: int = option()",
+                  "    astr: str = option()", ""]
+    return "\n".join(lines)
+
+
+def time_process(code: str, args, runs: int, env):
+    """
+    Wall time of `python -c code *args` in milliseconds, min and median of runs.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1e3)
+    times.sort()
+    return {"min_ms": times[0], "p50_ms": percentile(times, 50)}
+
+
+def main():
+    options = ImportBenchmarkOptions.parse_args()
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    with tempfile.TemporaryDirectory() as module_dir:
+        with open(os.path.join(module_dir, "many_options.py"), 'w') as f:
+            f.write(module_source(options.classes))
+        for name, eager in [("many_variants", False), ("many_variants_eager", True)]:
+            with open(os.path.join(module_dir, f"{name}.py"), 'w') as f:
+                f.write(variants_module_source(options.variant_classes, options.variants, eager))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([repo_root, module_dir]))
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        parse_code = "from many_options import CliOptions; CliOptions.parse_args()"
+        cli_args = ["-W", "4", "-t", "--net", "net2", "--method", "MethodA(aint=2,astr=x)"]
+
+        # compile options and the generated module once, as installed tools do
+        subprocess.run([sys.executable, "-c", "import many_options, many_variants, many_variants_eager"], env=env, check=True)
+        variants_name = f"{options.variant_classes} classes {options.variants} variants"
+        use_variants_code = "import many_variants as m; [getattr(m, n).get_variants() for n in dir(m) if n.startswith('Method')]"
+
+        results = {
+            "python -c pass": time_process("pass", [], options.runs, env),
+            "import options": time_process("import options", [], options.runs, env),
+            f"import {options.classes} classes": time_process("import many_options", [], options.runs, env),
+            "parse_args native": time_process(parse_code, cli_args, options.runs, env),
+            "parse_args argparse": time_process(parse_code, cli_args + ["--lr=0.5"], options.runs, env),
+            "parse_args --help": time_process(parse_code, ["--help"], options.runs, env),
+            f"import {variants_name}": time_process("import many_variants", [], options.runs, env),
+            f"import {variants_name} eager": time_process("import many_variants_eager", [], options.runs, env),
+            f"import {variants_name} all used": time_process(use_variants_code, [], options.runs, env),
+        }
+    report(results, ["min_ms", "p50_ms"], options, key="p50_ms", higher_is_better=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Memory retained by options instances, suboptions and variants, and transient allocations of parsing, by tracemalloc.
+# run from the repository root:
+# $ python -m benchmarks.memory_benchmark
+# By default results are compared with benchmarks/memory_baseline.json (CPython 3.11), exits with code 1
+# if any result is larger than the baseline by more than --max_regression. To update the baseline:
+# $ python -m benchmarks.memory_benchmark --json benchmarks/memory_baseline.json --baseline None
+
+import gc
+import os
+import tracemalloc
+
+from options import OptionsBase, option
+from benchmarks.schemas import make_method_class, make_options_class, non_default_str
+from benchmarks.utils import report
+
+
+class MemoryBenchmarkOptions(OptionsBase):
+    fields: str = option(default="5,50,500", help="comma separated numbers of fields of benchmarked classes")
+    instances: int = option(default=1000, help="number of instances of 5 field class created to measure retained memory, "
+                                               "fewer instances of larger classes are created")
+    variants: int = option(default=1000, help="number of registered variants")
+    json: str = option(help="write results to this file")
+    baseline: str = option(default=os.path.join(os.path.dirname(__file__), "memory_baseline.json"),
+                           help="compare results with this file")
+    max_regression: float = option(default=0.1, help="allowed relative growth against baseline")
+
+
+def retained(create, count):
+    """
+    Bytes per object retained by count objects returned from create().
+    """
+    create()  # warm up caches
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [create() for _ in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    del objects
+    return (after - before) / count
+
+
+def transient(fn, count=20):
+    """
+    Peak bytes allocated and released during one fn() call.
+    """
+    fn()  # warm up caches
+    peaks = []
+    for _ in range(count):
+        gc.collect()  # otherwise garbage of previous calls collected during fn() lowers the peak
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    return min(peaks)
+
+
+def field_benchmarks(n_fields, instances):
+    MethodA = make_method_class("MethodA")
+    MethodB = make_method_class("MethodB")
+    cls = make_options_class(n_fields, (MethodA, MethodB))
+    flat_str = non_default_str(cls)
+    nested_str = flat_str + " --method 'MethodA(aint=3,astr=x)'"
+
+    yield "instance", retained(lambda: cls.parse_args(flat_str), max(10, instances * 5 // n_fields))
+    yield "parse_into flat", transient(lambda: cls().parse(flat_str))
+    yield "parse_into nested", transient(lambda: cls().parse(nested_str))
+
+
+def suboption_benchmark(instances):
+    MethodA = make_method_class("MethodA")
+    cls = make_options_class(5, (MethodA,))
+    return retained(lambda: cls.parse_args("--method 'MethodA(aint=3,astr=x)'"), instances) -\
+        retained(lambda: cls.parse_args("--method None"), instances)
+
+
+def variant_benchmark(n_variants):
+    MethodV = make_method_class("MethodV")
+    MethodV.get_variants()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n_variants):
+        MethodV.register_variants(f"V{i}", {'aint': i, 'astr': f"v{i}"})
+    MethodV.get_variants()  # adds pending variants
+    gc.collect()
+    return (tracemalloc.get_traced_memory()[0] - before) / n_variants
+
+
+def main():
+    options = MemoryBenchmarkOptions.parse_args()
+    if options.baseline is not None and not os.path.exists(options.baseline):
+        options.baseline = None
+
+    tracemalloc.start()
+    results = dict()
+    for n_fields in map(int, options.fields.split(",")):
+        for name, size in field_benchmarks(n_fields, options.instances):
+            results[f"{name} fields={n_fields}"] = {"bytes": size}
+    results["nested suboption"] = {"bytes": suboption_benchmark(options.instances)}
+    results["registered variant"] = {"bytes": variant_benchmark(options.variants)}
+    tracemalloc.stop()
+
+    report(results, ["bytes"], options, key="bytes", higher_is_better=False)
+
+
+if __name__ == "__main__":
+    main()
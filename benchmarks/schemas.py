@@ -0,0 +1,72 @@
+"""
+Synthetic OptionsBase classes of given size for benchmarks, shaped like ExampleOptions.
+"""
+from options import OptionsBase, option
+
+
+def make_method_class(name: str, n_variants: int = 0) -> type:
+    """
+    Suboption class with variants V0..V<n_variants - 1>, variant i sets aint=i.
+    """
+    cls = type(name, (OptionsBase,), {
+        '__annotations__': {'abool': bool, 'aint': int, 'astr': str},
+        'abool': option(action="store_true"),
+        'aint': option(),
+        'astr': option(),
+    })
+    for i in range(n_variants):
+        cls.register_variants(f"V{i}", {'aint': i, 'astr': f"v{i}"})
+    return cls
+
+
+def make_options_class(n_fields: int, suboption_types=(), name: str = None) -> type:
+    """
+    Options class with n_fields fields of rotating kinds: int, str, store_true bool, float, str with choices.
+    If suboption_types are given, the last field is a suboption of the union of these types.
+    """
+    annotations = dict()
+    attrs = dict()
+    for i in range(n_fields - (1 if suboption_types else 0)):
+        field = f"f{i}"
+        match i % 5:
+            case 0:
+                annotations[field], attrs[field] = int, option(f"-i{i}", default=i)
+            case 1:
+                annotations[field], attrs[field] = str, option(default=f"s{i}", help=f"string field {i}")
+            case 2:
+                annotations[field], attrs[field] = bool, option(action="store_true")
+            case 3:
+                annotations[field], attrs[field] = float, option(default=0.5)
+            case 4:
+                annotations[field], attrs[field] = str, option(default="c0", choices=["c0", "c1", "c2"])
+
+    if suboption_types:
+        union = suboption_types[0]
+        for t in suboption_types[1:]:
+            union = union | t
+        annotations['method'], attrs['method'] = union, option()
+
+    attrs['__annotations__'] = annotations
+    return type(name or f"Options{n_fields}", (OptionsBase,), attrs)
+
+
+def non_default_str(optionsType) -> str:
+    """
+    Options string that sets every field of optionsType made by make_options_class() to a non-default value.
+    """
+    pieces = []
+    for field, field_type in optionsType.get_schema().type_hints.items():
+        argparse_kwargs = optionsType.get_schema().argparse_kwargs[field]
+        if field == 'method':
+            continue
+        if 'choices' in argparse_kwargs:
+            pieces.append(f"--{field} c1")
+        elif field_type is bool:
+            pieces.append(f"--{field}")
+        elif field_type is int:
+            pieces.append(f"--{field} 7")
+        elif field_type is float:
+            pieces.append(f"--{field} 1.5")
+        else:
+            pieces.append(f"--{field} x{field}")
+    return " ".join(pieces)
@@ -0,0 +1,112 @@
+# Stress test of concurrent use of option classes: threads parse, serialize, reduce for pickling and validate options of shared classes,
+# starting on classes whose schemas, action values and help are not computed yet. Every result is checked against
+# the result computed in a single thread, so corrupted shared state fails the benchmark. Scaling with the number of
+# threads is limited by the GIL, except on free-threaded CPython builds.
+# run from the repository root:
+# $ python -m benchmarks.threads_benchmark
+# $ python -m benchmarks.threads_benchmark --threads 1,4,16 --seconds 2 --json threads.json
+
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from options import OptionParser, OptionsBase, option, dump_many
+from benchmarks.schemas import make_method_class, make_options_class, non_default_str
+from benchmarks.utils import report
+
+
+class ThreadsBenchmarkOptions(OptionsBase):
+    threads: str = option(default="1,2,4,8", help="comma separated numbers of threads")
+    fields: int = option(default=50, help="number of fields of benchmarked classes")
+    seconds: float = option(default=0.5, help="time spent by each number of threads")
+    json: str = option(help="write results to this file")
+    baseline: str = option(help="compare ops/sec with results from this file")
+    max_regression: float = option(default=0.2, help="allowed relative slowdown against baseline")
+
+
+def make_class(n_fields):
+    """
+    New class, so that its schema and other caches are first computed concurrently.
+    """
+    return make_options_class(n_fields, (make_method_class("MethodA", 10), make_method_class("MethodB")))
+
+
+def operations(cls):
+    options_str = non_default_str(cls) + " --method 'MethodA(aint=3,astr=x)' --f0 -5"
+    parser = OptionParser(cls)
+
+    def reduce_roundtrip(o):
+        fn, args = o.__reduce__()
+        return fn(*args)
+
+    yield "parse_args", lambda: cls.parse_args(options_str)
+    yield "OptionParser", lambda: parser.instance_parse_opts(options_str)
+    yield "str_wo_defaults", lambda: cls.parse_args(options_str).str_wo_defaults
+    yield "dump_many", lambda: dump_many([cls.parse_args(options_str)] * 10, io.StringIO())
+    yield "__reduce__", lambda: reduce_roundtrip(cls.parse_args(options_str))
+    yield "validate", lambda: cls(**cls.validate(options_str).values)
+    yield "help", lambda: parser.argumentParser.format_help()
+
+
+def run_threads(n_threads, n_fields, seconds):
+    """
+    Runs all operations round-robin in n_threads threads for about seconds.
+    Returns number of operations done, wall time in seconds and list of errors.
+    """
+    cls = make_class(n_fields)
+    expected = {name: str(fn()) for name, fn in operations(make_class(n_fields))}
+
+    barrier = threading.Barrier(n_threads + 1)
+    stop = threading.Event()
+
+    def work():
+        ops = list(operations(cls))
+        errors = []
+        count = 0
+        barrier.wait()
+        while not stop.is_set():
+            for name, fn in ops:
+                result = str(fn())
+                if result != expected[name]:
+                    errors.append(f"{name}: '{result[:200]}' != '{expected[name][:200]}'")
+                count += 1
+        return count, errors
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        futures = [executor.submit(work) for _ in range(n_threads)]
+        barrier.wait()
+        start = time.perf_counter()
+        time.sleep(seconds)
+        stop.set()
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+    return sum(count for count, _ in results), elapsed, [e for _, errors in results for e in errors]
+
+
+def main():
+    options = ThreadsBenchmarkOptions.parse_args()
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"GIL {'enabled' if gil else 'disabled'}")
+
+    results = dict()
+    failed = False
+    single_thread_ops = None
+    for n_threads in map(int, options.threads.split(",")):
+        count, elapsed, errors = run_threads(n_threads, options.fields, options.seconds)
+        for e in sorted(set(errors)):
+            print(f"ERROR threads={n_threads} {e}", file=sys.stderr)
+        failed = failed or bool(errors)
+
+        ops_per_sec = count / elapsed
+        single_thread_ops = single_thread_ops or ops_per_sec / n_threads
+        results[f"threads={n_threads}"] = {"ops_per_sec": ops_per_sec, "speedup": ops_per_sec / single_thread_ops}
+
+    report(results, ["ops_per_sec", "speedup"], options, key="ops_per_sec", higher_is_better=True)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Throughput and latency of the main OptionsBase operations on synthetic classes with 5 to 500 fields.
+# run from the repository root:
+# $ python -m benchmarks.throughput_benchmark
+# store results and later compare with them, exits with code 1 if any operation got slower than --max_regression:
+# $ python -m benchmarks.throughput_benchmark --json baseline.json
+# $ python -m benchmarks.throughput_benchmark --baseline baseline.json --max_regression 0.2
+
+import io
+
+from options import OptionParser, OptionsBase, option, dump_many
+from benchmarks.schemas import make_method_class, make_options_class, non_default_str
+from benchmarks.utils import measure, report
+
+
+class ThroughputBenchmarkOptions(OptionsBase):
+    fields: str = option(default="5,50,500", help="comma separated numbers of fields of benchmarked classes")
+    variants: str = option(default="1,10,100,1000", help="comma separated numbers of variants of benchmarked suboptions")
+    seconds: float = option(default=0.2, help="time spent measuring one operation")
+    json: str = option(help="write results to this file")
+    baseline: str = option(help="compare ops/sec with results from this file")
+    max_regression: float = option(default=0.2, help="allowed relative slowdown against baseline")
+
+
+def field_benchmarks(n_fields):
+    MethodA = make_method_class("MethodA", 3)
+    MethodB = make_method_class("MethodB")
+    cls = make_options_class(n_fields, (MethodA, MethodB))
+
+    flat_str = non_default_str(cls)
+    nested_str = flat_str + " --method 'MethodA(aint=3,astr=x)'"
+    o = cls.parse_args(nested_str)
+    o2 = cls.parse_args(nested_str)
+    lines = [nested_str.replace("--f0 7", f"--f0 {i}") for i in range(100)]
+    columns = ["f0", "method"]
+
+    yield "construct", lambda: cls()
+    yield "parse_args flat", lambda: cls.parse_args(flat_str)
+    yield "parse_args nested", lambda: cls.parse_args(nested_str)
+    yield "__str__", lambda: str(o)
+    yield "str_wo_defaults", lambda: o.str_wo_defaults
+    yield "__eq__", lambda: o == o2
+    yield "write_to", lambda: o.write_to(io.StringIO())
+    yield "dump_many x100", lambda: dump_many([o] * 100, io.StringIO(), include_defaults=False)
+    yield "str_wo_defaults x100", lambda: io.StringIO().write("".join(o.str_wo_defaults + "\n" for _ in range(100)))
+    yield "parse_columns x100", lambda: OptionParser.parse_columns(cls, lines, fields=columns)
+    yield "parse_args+getattr x100", lambda: [[getattr(p, c) for c in columns] for p in map(cls.parse_args, lines)]
+
+
+def variant_benchmarks(n_variants):
+    MethodV = make_method_class(f"MethodV{n_variants}", n_variants)
+    MethodB = make_method_class("MethodB")
+    cls = make_options_class(5, (MethodB, MethodV))
+
+    no_variant = MethodV(aint=-1)
+    last_variant = f"--method V{n_variants - 1}"
+
+    yield "get_suboption_name", lambda: no_variant.get_suboption_name()
+    yield "parse union variant", lambda: cls.parse_args(last_variant)
+
+
+def main():
+    options = ThroughputBenchmarkOptions.parse_args()
+    results = dict()
+
+    for n_fields in map(int, options.fields.split(",")):
+        for name, fn in field_benchmarks(n_fields):
+            results[f"{name} fields={n_fields}"] = measure(fn, options.seconds)
+
+    for n_variants in map(int, options.variants.split(",")):
+        for name, fn in variant_benchmarks(n_variants):
+            results[f"{name} variants={n_variants}"] = measure(fn, options.seconds)
+
+    report(results, ["ops_per_sec", "p50_us", "p90_us", "p99_us"], options, key="ops_per_sec", higher_is_better=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measuring and reporting helpers shared by benchmarks.
+"""
+import json
+import sys
+import time
+
+
+def measure(fn, min_seconds=0.2, max_calls=100_000):
+    """
+    Calls fn repeatedly for about min_seconds and returns ops/sec and latency percentiles in microseconds.
+    """
+    fn()  # warm up caches
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    deadline = perf_counter_ns() + min_seconds * 1e9
+    while len(latencies) < max_calls and (len(latencies) < 5 or perf_counter_ns() < deadline):
+        start = perf_counter_ns()
+        fn()
+        latencies.append(perf_counter_ns() - start)
+
+    latencies.sort()
+    return {
+        "ops_per_sec": len(latencies) / (sum(latencies) / 1e9),
+        "p50_us": percentile(latencies, 50) / 1e3,
+        "p90_us": percentile(latencies, 90) / 1e3,
+        "p99_us": percentile(latencies, 99) / 1e3,
+    }
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * p // 100)]
+
+
+def print_table(results, columns):
+    width = max(len(name) for name in results)
+    print(f"{'':<{width}} " + " ".join(f"{c:>12}" for c in columns))
+    for name, result in results.items():
+        print(f"{name:<{width}} " + " ".join(f"{result[c]:>12.2f}" for c in columns))
+
+
+def check_regressions(results, baseline_path, key, max_regression, higher_is_better):
+    """
+    Compares results with baseline JSON written by a previous run.
+    Returns list of descriptions of results worse than baseline by more than max_regression (fraction).
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name][key], result[key]
+        change = (old - new) / old if higher_is_better else (new - old) / max(old, 1)
+        if change > max_regression:
+            regressions.append(f"{name}: {key} {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def report(results, columns, options, key, higher_is_better):
+    """
+    Prints results, writes them to options.json and fails if they regressed against options.baseline.
+    """
+    print_table(results, columns)
+
+    if options.json is not None:
+        with open(options.json, 'w') as f:
+            json.dump({"results": results}, f, indent=1)
+
+    if options.baseline is not None:
+        regressions = check_regressions(results, options.baseline, key, options.max_regression, higher_is_better)
+        for r in regressions:
+            print(f"REGRESSION {r}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -1,18 +1,29 @@
 import argparse
 from argparse import ArgumentParser
+from array import array
+import heapq
 import logging
 import typing
 from typing import Any, Type, Generic, TypeVar, get_type_hints, get_args, get_origin
 import types
 from functools import partial
+from contextlib import contextmanager
+import contextvars
+import mmap
+import os
+import re
+import struct
 import sys
+import threading
+import time
+import zlib
 
 logger = logging.getLogger(__name__)
 FORMAT = "%(levelname)s: %(message)s"
 logging.basicConfig(format=FORMAT)
 
 
-__all__ = ['option', 'OptionsBase', 'OptionParser', 'variant', 'OptionsError']
+__all__ = ['option', 'OptionsBase', 'OptionParser', 'variant', 'OptionsError', 'ValidationReport', 'SharedOptionsStore', 'OptionsFile', 'ConfigFileWatcher', 'dump_many', 'OptionsSummary']
 
 T = TypeVar('T')
 
@@ -22,8 +33,9 @@ def option(*name_or_flags, **kwargs) -> Any:
     Decorates type with meta-information.
     Arguments:
         *name_or_flags, **kwargs are similar to ArgumentParser.add_argument()
+    kwargs are stored read-only, so that classes can be used from many threads.
     """
-    return (name_or_flags, kwargs)
+    return (name_or_flags, types.MappingProxyType(kwargs))
 
 
 def variant(name, **kwargs):
@@ -37,11 +49,80 @@ def variant(name, **kwargs):
     return decorate
 
 
+class ParserStats:
+    """
+    Counters and cumulative timings of the parsing pipeline, collected only when enabled.
+    See OptionParser.profile() and OptionParser.stats().
+    Timings of suboptions parsing are included both in 'suboptionWrapper' and in phases of the outer parse_into() call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counts = dict()
+        self.seconds = dict()
+
+    def reset(self):
+        with self.lock:
+            self.counts = dict()
+            self.seconds = dict()
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counts[name] = self.counts.get(name, 0) + n
+
+    def start(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def lap(self, name, start) -> float:
+        """
+        Counts phase name and adds time since start to it.
+        Returns current time, which is the start of the next phase.
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - start
+        return now
+
+    def as_dict(self):
+        with self.lock:
+            return {"counts": dict(self.counts), "seconds": dict(self.seconds)}
+
+
+parser_stats = ParserStats()
+
+
+def count_type_hints(optionsType):
+    parser_stats.count("get_type_hints")
+    return get_type_hints(optionsType)
+
+
+# actions whose values are known without ArgumentParser: action -> (value if not passed, value if passed)
+NATIVE_ACTIONS = {
+    "store_true": lambda kwargs: (False, True),
+    "store_false": lambda kwargs: (True, False),
+    "store_const": lambda kwargs: (None, kwargs.get('const')),
+}
+# option() kwargs that are handled the same way by ArgumentParser and by the native parse path
+NATIVE_KWARGS = {'default', 'action', 'help', 'choices', 'const', 'metavar'}
+
+
 def get_action_value(argparse_kwargs, get_default=True) -> Any:
     """
     :param get_default: If True (default), returns value that is stored when the option is not passed
                         If False, returns value that is stored when the option is passed.
     """
+    action = argparse_kwargs.get('action')
+    if action in NATIVE_ACTIONS:
+        if get_default and 'default' in argparse_kwargs:
+            return argparse_kwargs['default']
+        return NATIVE_ACTIONS[action](argparse_kwargs)[0 if get_default else 1]
+
+    parser_stats.count("get_action_value parser")
     argumentParser = ArgumentParser()
     argumentParser.add_argument("--opt", **argparse_kwargs)
 
@@ -54,32 +135,209 @@ def get_action_value(argparse_kwargs, get_default=True) -> Any:
 
 
 def get_all_names(optionsType, optionName):
-    for paramName in get_type_hints(optionsType):
-        name_or_flags = getattr(optionsType, paramName)[0]
-        field_all_names = name_or_flags + (f"--{paramName}",)
-        if f"--{optionName}" in field_all_names:
-            return field_all_names
+    schema = optionsType.get_schema()
+    fieldName = schema.flags.get(f"--{optionName}")
+    if fieldName is None:
+        return None
 
-    return None
+    return schema.name_or_flags[fieldName]
+
+
+options_errors_quiet = contextvars.ContextVar("options_errors_quiet", default=False)  # True disables logging in the current context
 
 
 class OptionsError(Exception):
     """
     An error from creating or setting options.
+    The message is logged with log_level, set OptionsError.log_level = None to disable logging.
     """
+    log_level: int | None = logging.ERROR
 
     def __init__(self, message):
-        logger.error(message)
+        if OptionsError.log_level is not None and not options_errors_quiet.get():
+            logger.log(OptionsError.log_level, message)
         self.message = message
 
     def __str__(self):
         return self.message
 
 
+class OptionsSchema:
+    """
+    Meta-information about fields of an OptionsBase derived class, computed once per class.
+    See OptionsBase.get_schema().
+    """
+
+    def __init__(self, optionsType):
+        self.optionsType = optionsType
+        self.type_hints = count_type_hints(optionsType)
+        self.fields = tuple(self.type_hints)
+        self.name_or_flags = dict()    # field name -> all names and flags, including --<field name>
+        self.argparse_kwargs = dict()  # field name -> kwargs passed to option()
+        self.flags = dict()            # name or flag -> field name
+        self.suboption_types = dict()  # field name -> OptionsBase derived types permitted for the field
+        self.union_fields = set()      # fields with union types
+        self.str_prefixes = dict()     # field name -> prefixes of the field in str(), first and following fields
+        self.suboption_prefixes = dict()  # field name -> prefix of the field in suboption_str__()
+        self.defaults = dict()
+        self.__action_values = dict()
+        self.canonical_cache = dict()
+        self.canonical_cache_generation = variants_generation
+        self.fingerprint = zlib.crc32(";".join(f"{k}:{v}" for k, v in self.type_hints.items()).encode())
+        # precomputed prefixes can be used if string formatting is not overridden
+        self.default_format = all(getattr(optionsType, name) is getattr(OptionsBase, name)
+                                  for name in ("__str__", "to_str", "option_format", "suboption_field_format",
+                                               "suboption_str__", "get_suboption_name"))
+
+        for fieldName, field_type in self.type_hints.items():
+            if not hasattr(optionsType, fieldName):
+                raise OptionsError("All fields must be initialized with options().")
+            name_or_flags, argparse_kwargs = getattr(optionsType, fieldName)
+
+            self.name_or_flags[fieldName] = name_or_flags + (f"--{fieldName}",)
+            self.argparse_kwargs[fieldName] = argparse_kwargs
+            for flag in self.name_or_flags[fieldName]:
+                self.flags.setdefault(flag, fieldName)
+            self.str_prefixes[fieldName] = (f"--{fieldName} ", f" --{fieldName} ")
+            self.suboption_prefixes[fieldName] = f"{fieldName}="
+
+            if get_origin(field_type) is types.UnionType:
+                self.union_fields.add(fieldName)
+                if all(isinstance(t, type) and issubclass(t, OptionsBase) for t in get_args(field_type)):
+                    self.suboption_types[fieldName] = get_args(field_type)
+            elif isinstance(field_type, type) and issubclass(field_type, OptionsBase):
+                self.suboption_types[fieldName] = (field_type,)
+
+            if 'default' in argparse_kwargs:
+                self.defaults[fieldName] = argparse_kwargs['default']
+            elif 'action' in argparse_kwargs:
+                self.defaults[fieldName] = get_action_value(argparse_kwargs)
+            else:
+                self.defaults[fieldName] = None
+
+        # own fields can be parsed without ArgumentParser with the same result, see native_parsable
+        self.fields_native_parsable = all(
+            kwargs.keys() <= NATIVE_KWARGS and kwargs.get('action', "store_true") in NATIVE_ACTIONS and
+            all(flag.startswith("-") for flag in self.name_or_flags[fieldName])
+            for fieldName, kwargs in self.argparse_kwargs.items())
+        self.__native_parsable = None
+
+    @property
+    def native_parsable(self) -> bool:
+        """
+        True if fields of the class and of all its suboption types can be parsed by OptionParser.parse_native().
+        Computed on first use, as suboption types can refer to the class itself.
+        """
+        if self.__native_parsable is None:
+            seen = {self.optionsType}
+            pending = [self]
+            native_parsable = True
+            while pending and native_parsable:
+                schema = pending.pop()
+                native_parsable = schema.fields_native_parsable
+                for t in (t for permitted_types in schema.suboption_types.values() for t in permitted_types):
+                    if t not in seen:
+                        seen.add(t)
+                        pending.append(t.get_schema())
+            self.__native_parsable = native_parsable
+        return self.__native_parsable
+
+    def get_canonical_cache(self) -> dict:
+        """
+        Returns (field name, value string) -> (canonical field string or None for default value, errors) cache
+        of OptionsBase.canonicalize(). It is cleared when it grows too large or variants of any class change.
+        """
+        if self.canonical_cache_generation != variants_generation or len(self.canonical_cache) > CANONICAL_CACHE_SIZE:
+            self.canonical_cache = dict()
+            self.canonical_cache_generation = variants_generation
+        return self.canonical_cache
+
+    def has_action(self, fieldName) -> bool:
+        return 'action' in self.argparse_kwargs[fieldName]
+
+    def action_value(self, fieldName) -> Any:
+        """
+        Value stored by the field's action when its flag is passed without a value.
+        """
+        if fieldName not in self.__action_values:
+            parser_stats.count("action value cache miss")
+            # setdefault keeps the value of the thread that stored it first
+            self.__action_values.setdefault(fieldName, get_action_value(self.argparse_kwargs[fieldName], get_default=False))
+        else:
+            parser_stats.count("action value cache hit")
+        return self.__action_values[fieldName]
+
+
+class ValidationReport:
+    """
+    Result of OptionsBase.validate(): all problems found and values of the fields that passed the checks.
+    """
+
+    def __init__(self, optionsType):
+        self.optionsType = optionsType
+        self.errors = []   # list of (field path, message)
+        self.values = dict()
+
+    def add_error(self, path, message):
+        self.errors.append((path, message))
+
+    @property
+    def ok(self) -> bool:
+        return len(self.errors) == 0
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __str__(self) -> str:
+        return "\n".join(f"{path}: {message}" for path, message in self.errors)
+
+    def raise_if_errors(self):
+        if not self.ok:
+            raise OptionsError(f"Validation of {self.optionsType.__name__} failed:\n{self}")
+
+
+schema_lock = threading.RLock()  # taken only when a schema is computed, schemas of suboption types are computed recursively
+variants_lock = threading.RLock()
+variants_generation = 0  # incremented when variants are registered, invalidates caches that depend on them
+CANONICAL_CACHE_SIZE = 1 << 16
+
+
+class VariantsView(typing.Mapping[str, typing.Mapping[str, Any]]):
+    """
+    Read-only mapping of variant names to read-only field values, see OptionsBase.get_variants().
+    Field values are wrapped when they are accessed, so that variants do not keep a wrapper each.
+    """
+    __slots__ = ("variants",)
+
+    def __init__(self, variants: dict):
+        self.variants = variants  # variant name -> dict of field values, not modified after construction
+
+    def __getitem__(self, name) -> typing.Mapping[str, Any]:
+        return types.MappingProxyType(self.variants[name])
+
+    def __iter__(self):
+        return iter(self.variants)
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def __contains__(self, name) -> bool:
+        return name in self.variants
+
+
+NO_VARIANTS = VariantsView(dict())
+
+
 class OptionsBase:
+    # If True, fields equal to their default values are not stored in pickles.
+    pickle_omit_defaults = False
+    # If True, variants are checked when they are registered instead of on first use, e.g. set OptionsBase.check_variants_eagerly in tests.
+    check_variants_eagerly = False
+
     def __init__(self, **kwargs):
-        # set defaults
-        self.set_fields(**self.get_default_field_values())
+        # set defaults, not with set_fields(**...), that copies the dict of all fields
+        for k, v in self.get_default_field_values().items():
+            self.__setattr__(k, v)
 
         # set passed args
         self.set_fields(**kwargs)
@@ -95,7 +353,28 @@ class OptionsBase:
         self.__check_constraints(__name, __value)
         super(OptionsBase, self).__setattr__(__name, __value)
 
+    def __reduce__(self):
+        """
+        Pickles options as schema fingerprint and field values in schema order.
+        """
+        schema = self.get_schema()
+        _vars = vars(self)
+        if not self.pickle_omit_defaults:
+            return unpickle_options, (type(self), schema.fingerprint, tuple(map(_vars.__getitem__, schema.fields)))
+
+        mask = 0
+        values = []
+        defaults = schema.defaults
+        for i, k in enumerate(schema.fields):
+            v = _vars[k]
+            if v != defaults[k]:
+                mask |= 1 << i
+                values.append(v)
+        return unpickle_options, (type(self), schema.fingerprint, tuple(values), mask)
+
     def __eq__(self, __o: object) -> bool:
+        if not isinstance(__o, OptionsBase):
+            return NotImplemented  # e.g. SharedOptionsView or SuboptionValues compare themselves with options
         return type(__o) == type(self) and\
                vars(self) == vars(__o)
 
@@ -133,38 +412,124 @@ class OptionsBase:
         """
         OptionParser.parse_into(self, options_str=options_str)
 
+    @classmethod
+    def get_schema(cls) -> OptionsSchema:
+        """
+        Returns fields meta-information of cls, it is computed on first call.
+        """
+        schema = cls.__dict__.get("__schema")
+        if schema is None:
+            with schema_lock:
+                if "__schema" not in cls.__dict__:
+                    parser_stats.count("schema cache miss")
+                    setattr(cls, "__schema", OptionsSchema(cls))
+                schema = cls.__dict__["__schema"]
+        else:
+            parser_stats.count("schema cache hit")
+        return schema
+
     @classmethod
     def get_default_field_values(cls) -> typing.Dict[str, Any]:
-        defaults = dict()
+        return dict(cls.get_schema().defaults)
 
-        for fieldName in get_type_hints(cls):
-            if not hasattr(cls, fieldName):
-                raise OptionsError("All fields must be initialized with options().")
-            argparse_kwargs = getattr(cls, fieldName)[1]
-            if 'default' in argparse_kwargs:
-                defaults[fieldName] = argparse_kwargs['default']
-            elif 'action' in argparse_kwargs:
-                defaults[fieldName] = get_action_value(argparse_kwargs)
+    @classmethod
+    def validate(cls, options) -> ValidationReport:
+        """
+        Checks all fields of options without raising or logging, nested suboptions included.
+
+        :param options: mapping of field names to values or options string
+        """
+        report = ValidationReport(cls)
+        if isinstance(options, str):
+            report.values = scan_options(cls, options.split(), report)
+        else:
+            report.values = check_options(cls, options, report)
+        return report
+
+    @classmethod
+    def canonicalize(cls, options_str: str) -> str:
+        """
+        Returns canonical form of options_str, the same as str_wo_defaults of options parsed from it, without creating options:
+        flag aliases are resolved, fields are in class order, fields with default values are omitted,
+        values of actions are stored explicitly and suboptions are named by their first matching variant.
+        __str__() and suboption_str__() overrides are not used.
+        Strings rejected by validate() or with repeated fields are parsed with parse_line(), as their values can differ
+        from values scanned by validate(). Raises OptionsError if options_str is not valid.
+        """
+        schema = cls.get_schema()
+        cache = schema.get_canonical_cache()
+        report = ValidationReport(cls)
+        pieces = dict()
+        splitted = options_str.split()
+
+        for fieldName, argument_str_val in scan_flags(schema, splitted, report):
+            key = (fieldName, argument_str_val)
+            cached = cache.get(key)
+            if cached is None:
+                value_report = ValidationReport(cls)
+                value = canonical_value(schema, fieldName, argument_str_val, value_report)
+                piece = None  # field has default value
+                if value is not INVALID and value != schema.defaults[fieldName]:
+                    piece = cls.option_format(fieldName, value.suboption_str() if isinstance(value, SuboptionValues) else value)
+                cached = cache[key] = (piece, value_report.errors)
+
+            piece, errors = cached
+            if errors:
+                report.errors.extend(errors)
             else:
-                defaults[fieldName] = None
+                pieces[fieldName] = piece
+
+        if not report.ok or repeats_fields(schema, pieces, splitted):
+            options, report.errors = parse_line(cls, options_str)
+            report.raise_if_errors()
+            return options.str_wo_defaults
 
-        return defaults
+        return " ".join(pieces[k] for k in schema.fields if pieces.get(k) is not None)
 
     @classmethod
     def register_variants(cls, variant_name, opts):
-        for n, v in opts.items():
-            cls.__check_constraints(n, v)
-        cls.get_variants().update({variant_name: opts})
+        """
+        Variants are checked and added in one batch when they are first used, see get_variants(),
+        or immediately if cls.check_variants_eagerly is True.
+        """
+        with variants_lock:
+            if "__pending_variants" not in cls.__dict__:
+                setattr(cls, "__pending_variants", [])
+            cls.__dict__["__pending_variants"].append((variant_name, dict(opts)))
+            global variants_generation
+            variants_generation += 1
+        if cls.check_variants_eagerly:
+            cls.get_variants()
 
     @classmethod
     def get_variants(cls):
-        if not hasattr(cls, "__variants"):
-            setattr(cls, "__variants", dict())
-        return getattr(cls, "__variants")
+        """
+        Returns read-only mapping of variant names of cls to their field values, variants of base classes are not included.
+        """
+        if "__pending_variants" in cls.__dict__:
+            cls.__add_pending_variants()
+        return cls.__dict__.get("__variants", NO_VARIANTS)
+
+    @classmethod
+    def __add_pending_variants(cls):
+        with variants_lock:
+            pending = cls.__dict__.get("__pending_variants")
+            if pending is None:
+                return  # added by another thread
+
+            for _, opts in pending:
+                for n, v in opts.items():
+                    cls.__check_constraints(n, v)
+
+            # variants are replaced, not updated, so that they can be read without locking
+            variants = dict(cls.__dict__.get("__variants", NO_VARIANTS).variants)
+            variants.update(pending)
+            setattr(cls, "__variants", VariantsView(variants))
+            delattr(cls, "__pending_variants")
 
     @classmethod
     def get_variants_help(cls):
-        return "\n".join(name + " " + str(opts) for name, opts in cls.get_variants().items())
+        return "\n".join(name + " " + str(dict(opts)) for name, opts in cls.get_variants().items())
 
     @staticmethod
     def option_format(k, v):
@@ -187,17 +552,104 @@ class OptionsBase:
 
         return self.__str__(non_defaults)
 
-    def get_suboption_name(self):
-        name = type(self).__name__
-        opts = vars(self)
+    def get_field_values(self) -> tuple:
+        """
+        Returns field values in schema order, suboptions are represented as (type, values) pairs.
+        Compact form for sending options between processes, see from_field_values().
+        """
+        suboption_types = self.get_schema().suboption_types
+        _vars = vars(self)
+        return tuple((type(_vars[k]), _vars[k].get_field_values()) if k in suboption_types and _vars[k] is not None else _vars[k]
+                     for k in self.get_schema().fields)
 
-        for var_name, var_opts in self.get_variants().items():
-            if all([opts[var_opt_name] == var_opt_val for var_opt_name, var_opt_val in var_opts.items()]):
-                name = var_name
-                opts = {other_opt_name: other_opt_val for other_opt_name, other_opt_val in opts.items() if other_opt_name not in var_opts}
-                break
+    @classmethod
+    def from_field_values(cls: Type[T], values: tuple) -> T:
+        """
+        Creates options from values returned by get_field_values() without checking constraints.
+        """
+        schema = cls.get_schema()
+        fields = dict(zip(schema.fields, values))
+        for k in schema.suboption_types:
+            if fields[k] is not None:
+                suboption_type, suboption_values = fields[k]
+                fields[k] = suboption_type.from_field_values(suboption_values)
+        return new_options_unchecked(cls, fields)
+
+    def to_dict(self, include_defaults=True) -> typing.Dict[str, Any]:
+        """
+        Returns field values, suboptions are represented by their as_variant strings.
+
+        :param include_defaults: If False, fields which values are equal to the default value will be omitted.
+        """
+        defaults = self.get_schema().defaults
+        return {k: v.as_variant if isinstance(v, OptionsBase) else v
+                for k, v in vars(self).items() if include_defaults or defaults[k] != v}
+
+    def write_to(self, fp, include_defaults=True, format="str"):
+        """
+        Writes options into text file object fp.
+
+        :param format: "str" writes the same text as to_str(include_defaults),
+                       "json" writes to_dict(include_defaults) as JSON object.
+        """
+        if format == "json":
+            import json
+            fp.write(json.dumps(self.to_dict(include_defaults), default=str))
+        elif format == "str":
+            pieces = []
+            self.append_str_pieces(pieces, include_defaults)
+            fp.write("".join(pieces))
+        else:
+            raise OptionsError(f"Unknown format '{format}', expected 'str' or 'json'.")
+
+    def append_str_pieces(self, pieces: list, include_defaults=True):
+        """
+        Appends pieces of to_str(include_defaults) to pieces list, using field prefixes precomputed in schema.
+        """
+        schema = self.get_schema()
+        if not schema.default_format:
+            pieces.append(self.to_str(include_defaults))
+            return
+
+        str_prefixes = schema.str_prefixes
+        defaults = schema.defaults
+        first = True
+        for k, v in vars(self).items():
+            if not include_defaults and not defaults[k] != v:
+                continue
+            pieces.append(str_prefixes[k][0] if first else str_prefixes[k][1])
+            first = False
+            if isinstance(v, OptionsBase):
+                v.append_suboption_str_pieces(pieces)
+            else:
+                pieces.append(f"{v}")
+
+    def append_suboption_str_pieces(self, pieces: list):
+        """
+        Appends pieces of suboption_str__() to pieces list, using field prefixes precomputed in schema.
+        """
+        schema = self.get_schema()
+        if not schema.default_format:
+            pieces.append(self.suboption_str__())
+            return
+
+        suboption_name, _vars = self.get_suboption_name()
+        if len(_vars) == 0:
+            pieces.append(suboption_name)
+            return
+
+        pieces.append("'" + suboption_name + "(")
+        first = True
+        for k, v in _vars.items():
+            if not first:
+                pieces.append(",")
+            first = False
+            pieces.append(schema.suboption_prefixes[k])
+            pieces.append(f"{v}")
+        pieces.append(")'")
 
-        return name, opts
+    def get_suboption_name(self):
+        return get_suboption_name(type(self), vars(self))
 
     def suboption_str__(self) -> str:
         suboption_name, _vars = self.get_suboption_name()
@@ -207,36 +659,104 @@ class OptionsBase:
 
     @classmethod
     def __check_constraints(cls, name, value):
-        try:
-            cls.__check_field_exists(name, type(value))
-            cls.__check_valid_choice(name, value)
-        except OptionsError as e:
-            raise OptionsError(f"Constraints check failed for {cls.__name__} field '{name}' and value '{value}': {e.message}") from e
+        error = cls.get_constraints_error(name, value)
+        if error is not None:
+            raise OptionsError(error)
+
+    @classmethod
+    def get_constraints_error(cls, name, value) -> str | None:
+        """
+        Returns description of the constraint violated by setting field name to value, None if there is none.
+        """
+        schema = cls.get_schema()
+        error = cls.__field_exists_error(schema, name, type(value)) or cls.__valid_choice_error(schema, name, value)
+        if error is None:
+            return None
+        return f"Constraints check failed for {cls.__name__} field '{name}' and value '{value}': {error}"
 
     @classmethod
-    def __check_field_exists(cls, name, of_type):
+    def __field_exists_error(cls, schema, name, of_type):
         """
         Checks field with given name and type exists.
         """
-        if name not in get_type_hints(cls):
-            raise OptionsError(f"{name} is not among {cls.__name__} type fields: {[*get_type_hints(cls)]}")
-        cls.__check_field_type_match(name, of_type)
+        type_hints = schema.type_hints
+        if name not in type_hints:
+            return f"{name} is not among {cls.__name__} type fields: {[*type_hints]}"
+        return cls.__field_type_match_error(schema, name, of_type)
 
     @classmethod
-    def __check_field_type_match(cls, field_name, of_type):
-        field_type = get_type_hints(cls)[field_name]
+    def __field_type_match_error(cls, schema, field_name, of_type):
+        field_type = schema.type_hints[field_name]
+        if field_type is of_type:
+            return None
         matched_type = match_type(field_type, of_type)
 
         if matched_type is None and of_type is not types.NoneType:
-            raise OptionsError(f"type {of_type} does not match field type {field_type}.")
+            return f"type {of_type} does not match field type {field_type}."
+        return None
 
     @classmethod
-    def __check_valid_choice(cls, field_name, value):
-        argparse_args = getattr(cls, field_name)[1]
-        
+    def __valid_choice_error(cls, schema, field_name, value):
+        argparse_args = schema.argparse_kwargs[field_name]
+
         choices = argparse_args.get('choices', None)
         if choices is not None and value not in choices and value is not None:
-            raise OptionsError(f"invalid choice '{value}', (choose from {choices + [None]}).")
+            return f"invalid choice '{value}', (choose from {choices + [None]})."
+        return None
+
+
+def dump_many(options: typing.Iterable[OptionsBase], fp, include_defaults=True, format="str", batch_size=1000):
+    """
+    Writes options into text file object fp, one per line, see OptionsBase.write_to().
+    Lines are joined and written in batches of batch_size options.
+    """
+    if format not in ("str", "json"):
+        raise OptionsError(f"Unknown format '{format}', expected 'str' or 'json'.")
+    import json
+
+    pieces = []
+    for i, o in enumerate(options, 1):
+        if format == "json":
+            pieces.append(json.dumps(o.to_dict(include_defaults), default=str))
+        else:
+            o.append_str_pieces(pieces, include_defaults)
+        pieces.append("\n")
+
+        if i % batch_size == 0:
+            fp.write("".join(pieces))
+            pieces.clear()
+
+    fp.write("".join(pieces))
+
+
+def new_options_unchecked(optionsType: Type[T], fields: typing.Dict[str, Any]) -> T:
+    """
+    Creates options with given values of all fields, in schema order, bypassing constraint checks.
+    """
+    options = optionsType.__new__(optionsType)
+    vars(options).update(fields)
+    return options
+
+
+def unpickle_options(optionsType: Type[T], fingerprint, values, mask=None) -> T:
+    """
+    Restores options pickled by OptionsBase.__reduce__().
+    """
+    schema = optionsType.get_schema()
+    if fingerprint != schema.fingerprint:
+        raise OptionsError(f"Pickled {optionsType.__name__} does not match its current fields: {[*schema.type_hints]}")
+
+    if mask is None:
+        options = optionsType.__new__(optionsType)
+        vars(options).update(zip(schema.fields, values))
+        return options
+
+    fields = dict(schema.defaults)  # in schema order
+    for v in values:
+        low_bit = mask & -mask
+        fields[schema.fields[low_bit.bit_length() - 1]] = v
+        mask ^= low_bit
+    return new_options_unchecked(optionsType, fields)
 
 
 def process_arguments(optionsType: Type[T], splitted_opts):
@@ -265,20 +785,18 @@ def process_argument(optionsType: Type[T], idx, splitted_opts):
         return argparse_compatible_pieces, dict()
 
     argument_str_val = splitted_opts[idx+1]
-    type_hints = get_type_hints(optionsType)
+    schema = optionsType.get_schema()
+    fieldName = schema.flags.get(argument_str_name)
 
-    for fieldName, field_type in type_hints.items():
-        name_or_flags, argparse_kwargs = getattr(optionsType, fieldName)
-        name_or_flags += (f"--{fieldName}",)
-        if argument_str_name not in name_or_flags:
-            continue
+    if fieldName is not None:
+        field_type = schema.type_hints[fieldName]
 
         if argument_str_val == "None":
             additional_opt[fieldName] = None
             logger.debug(f"Store None into {fieldName} field.")
 
-        elif 'action' in argparse_kwargs:
-            action_store_val = get_action_value(argparse_kwargs, get_default=False)
+        elif schema.has_action(fieldName):
+            action_store_val = schema.action_value(fieldName)
             if argument_str_val == str(action_store_val):
                 logger.debug(f"ignore option value that is equal to the value stored by its action: {splitted_opts[idx]} {argument_str_val}")
                 argparse_compatible_pieces.append(argument_str_name)
@@ -288,20 +806,19 @@ def process_argument(optionsType: Type[T], idx, splitted_opts):
         else:
             argparse_compatible_pieces.extend(splitted_opts[idx:idx+2])
 
-        break
-
     if not argparse_compatible_pieces and not additional_opt:
         raise OptionsError(f'{argument_str_name} is not found among {optionsType.__name__} fields.')
 
     return argparse_compatible_pieces, additional_opt
 
 
+BOOL_STRINGS = {"True": True, "False": False}
+
+
 def parse_val(val_type: Type[T], val_str: str) -> T:
     if val_type == bool:
-        if val_str == "True":
-            return True
-        if val_str == "False":
-            return False
+        if val_str in BOOL_STRINGS:
+            return BOOL_STRINGS[val_str]
         raise OptionsError(f'Cannot parse bool from {val_str}.')
 
     # let python try to parse
@@ -346,11 +863,72 @@ def match_variant_by_name(find_in: Type[T1] | types.UnionType, to_match: str) ->
     return target_type, variant_opts
 
 
-def suboptionWrapper(parsed_types, string: str):
+def build_variant_index(variants):
+    """
+    Groups variants by their fields: fields -> field values -> (position of the variant, variant name).
+    Variants with unhashable values are returned separately as (position, name, field values).
+    """
+    groups = dict()
+    unhashable = []
+    for position, (name, opts) in enumerate(variants.items()):
+        fields = tuple(opts)
+        try:
+            groups.setdefault(fields, dict()).setdefault(tuple(opts.values()), (position, name))
+        except TypeError:
+            unhashable.append((position, name, opts))
+    return groups, unhashable
+
+
+def find_variant(optionsType, values: typing.Mapping[str, Any]):
+    """
+    Returns name of the first variant of optionsType whose field values are all equal to values, None if there is none.
+    """
+    variants = optionsType.get_variants()
+    if not variants:
+        return None
+
+    cached = optionsType.__dict__.get("__variant_index")
+    if cached is None or cached[0] is not variants:
+        cached = (variants, build_variant_index(variants))
+        setattr(optionsType, "__variant_index", cached)  # the same index may be built by several threads
+    groups, unhashable = cached[1]
+
+    found = None
+    try:
+        for fields, group in groups.items():
+            match = group.get(tuple(values[k] for k in fields))
+            if match is not None and (found is None or match < found):
+                found = match
+    except TypeError:  # unhashable value, variants are compared one by one
+        return next((name for name, opts in variants.items() if all(values[k] == v for k, v in opts.items())), None)
+
+    for position, name, opts in unhashable:
+        if (found is None or position < found[0]) and all(values[k] == v for k, v in opts.items()):
+            found = (position, name)
+    return None if found is None else found[1]
+
+
+def get_suboption_name(optionsType, values: typing.Mapping[str, Any]):
+    """
+    Returns name of the first variant matching values and values of fields not set by it,
+    or name of optionsType and all values if no variant matches.
+    """
+    name = find_variant(optionsType, values)
+    if name is None:
+        return optionsType.__name__, values
+    var_opts = optionsType.get_variants()[name]
+    return name, {k: v for k, v in values.items() if k not in var_opts}
+
+
+def split_suboption_str(string: str):
+    """
+    Splits suboption string, e.g. 'MethodA(aint=1,abool=True)', into name 'MethodA' and options string '--aint 1 --abool True'.
+    Returns None if string is malformed.
+    """
     if string.startswith('\'') and string.endswith('\''):
         string = string[1:-1]
     elif string.startswith('\'') or string.endswith('\''):
-        raise OptionsError(f"unexpected suboption str : {string}. It starts or ends with ' sign, probably string is parsed incorrectly. Suboption string should not contain spaces!")
+        return None
 
     idx = string.find('(')
     if idx == -1:
@@ -367,6 +945,16 @@ def suboptionWrapper(parsed_types, string: str):
                        .replace('=', ' ')\
                        .replace(',', ' --')
 
+    return name, args
+
+
+def suboptionWrapper(parsed_types, string: str):
+    start = parser_stats.start()
+    split = split_suboption_str(string)
+    if split is None:
+        raise OptionsError(f"unexpected suboption str : {string}. It starts or ends with ' sign, probably string is parsed incorrectly. Suboption string should not contain spaces!")
+    name, args = split
+
     if name == "None":
         return None
 
@@ -380,86 +968,1457 @@ def suboptionWrapper(parsed_types, string: str):
         opts.parse(options_str=args)
     except OptionsError as e:
         raise OptionsError(f"failed to parse suboption of type {target_type} from '{args}' : {e}") from e
+    parser_stats.lap("suboptionWrapper", start)
     return opts
 
 
-class OptionParser(Generic[T]):
+INVALID = object()  # marks values that failed conversion in scan_value()
 
-    def __init__(self, optionsType: Type[T]) -> None:
-        self.optionsType = optionsType
-        self.argumentParser = OptionParser.create_argumentParser()
-        OptionParser.register_opts(self.argumentParser, self.optionsType)
 
-    @staticmethod
-    def create_argumentParser():
-        return ArgumentParser(exit_on_error=False)
+NEGATIVE_NUMBER = re.compile(r'^-\d+$|^-\d*\.\d+$')  # ArgumentParser._negative_number_matcher
 
-    @staticmethod
-    def register_opts(argumentParser: ArgumentParser, optionsType: Type[T]):
-        for param, hint_type in get_type_hints(optionsType).items():
-            name_or_flags, argparse_kwargs = getattr(optionsType, param)
 
-            if get_origin(hint_type) is types.UnionType:
-                if all(issubclass(t, OptionsBase) for t in get_args(hint_type)):
-                    suboption_parser = partial(suboptionWrapper, hint_type)
-                    argparse_kwargs['type'] = suboption_parser
-                else:
-                    logger.error(f'not all types of {hint_type} are subclasses of {OptionsBase}')
+def is_negative_number(string: str) -> bool:
+    """
+    Same check ArgumentParser uses to treat strings starting with '-' as values, e.g. -1e5 is treated as a flag.
+    """
+    return NEGATIVE_NUMBER.match(string) is not None
 
-            elif issubclass(hint_type, OptionsBase):
-                suboption_parser = partial(suboptionWrapper, hint_type)
-                argparse_kwargs['type'] = suboption_parser
-                argparse_kwargs['help'] = argparse_kwargs.get('help', '') + hint_type.get_variants_help()
-            elif 'action' not in argparse_kwargs:
-                argparse_kwargs['type'] = hint_type
 
-            argumentParser.add_argument(f"--{param}", *name_or_flags, **argparse_kwargs)
+def scan_options(optionsType: Type[T], splitted_opts, report: ValidationReport, path=""):
+    """
+    Converts and checks values of fields passed in splitted_opts without raising.
+    Problems are added to report, returns dict of values of the fields that passed the checks.
+    """
+    schema = optionsType.get_schema()
+    values = dict()
 
-    def instance_parse_opts(self, options_str: str = None) -> T:
-        return OptionParser.parse_opts(self.optionsType,
-                                       argumentParser=self.argumentParser,
-                                       options_str=options_str)
+    for fieldName, argument_str_val in scan_flags(schema, splitted_opts, report, path):
+        value = scan_value(schema, fieldName, argument_str_val, report, path + fieldName)
+        if value is INVALID:
+            continue
 
-    @staticmethod
-    def parse_opts(optionsType: Type[T], *, argumentParser: ArgumentParser = None, options_str: str = None) -> T:
-        """
-            Creates options from options_str.
+        error = optionsType.get_constraints_error(fieldName, value)
+        if error is not None:
+            report.add_error(path + fieldName, error)
+            continue
 
-            :param argumentParser: If not None, must have options already registered
-                                   via OptionParser.register_opts(argumentParser, optionsType)
-            :param options_str: If not None, options are parsed from options_str
-                                If None, options are parsed from the script arguments
-        """
-        options = optionsType()
-        OptionParser.parse_into(options, argumentParser=argumentParser, options_str=options_str)
-        return options
+        values[fieldName] = value
 
-    @staticmethod
-    def parse_into(options: OptionsBase, *, argumentParser: ArgumentParser = None,  options_str: str = None):
-        """
-        Sets only fields contained in options_str.
-        """
-        if argumentParser is None:
-            argumentParser = OptionParser.create_argumentParser()
-            OptionParser.register_opts(argumentParser, type(options))
+    return values
 
-        if options_str is None:
-            splitted = sys.argv[1:]
-        else:
-            splitted = options_str.split()
 
-        argparse_compatible_opts, additional_opts = process_arguments(type(options), splitted)
-        argparse_compatible_opts_str = " ".join(argparse_compatible_opts)
+def scan_flags(schema: OptionsSchema, splitted_opts, report: ValidationReport, path=""):
+    """
+    Yields (field name, value string or None if the flag is passed without a value) pairs of flags in splitted_opts.
+    Unknown flags and stray values are added to report.
+    """
+    idx = 0
+    while idx < len(splitted_opts):
+        argument_str_name = splitted_opts[idx]
+        fieldName = schema.flags.get(argument_str_name)
+        idx += 1
+
+        if fieldName is None:
+            if argument_str_name.startswith("-"):
+                report.add_error(path + argument_str_name, f'{argument_str_name} is not found among {schema.optionsType.__name__} fields.')
+            else:
+                report.add_error(path + argument_str_name, f'unrecognized argument {argument_str_name}')
+            continue
 
-        try:
-            parsed_by_argparse = argumentParser.parse_args(argparse_compatible_opts)
-        except argparse.ArgumentError as e:
-            raise OptionsError(f"Failed to parse '{argparse_compatible_opts_str}' with argumentParser: {e}") from e
+        argument_str_val = None
+        if idx < len(splitted_opts):
+            next_str = splitted_opts[idx]
+            if not next_str.startswith("-") or (not schema.has_action(fieldName) and is_negative_number(next_str)):
+                argument_str_val = next_str
+                idx += 1
 
-        for k, v in vars(parsed_by_argparse).items():
+        yield fieldName, argument_str_val
+
+
+def scan_value(schema: OptionsSchema, fieldName, argument_str_val, report: ValidationReport, path):
+    """
+    Converts field value from string the same way as OptionParser.parse_into() does.
+    Returns INVALID and adds problem to report if conversion fails.
+    """
+    if schema.has_action(fieldName):
+        if argument_str_val is None:
+            return schema.action_value(fieldName)
+        if argument_str_val == "None":
+            return None
+        if argument_str_val == str(schema.action_value(fieldName)):
+            return schema.action_value(fieldName)
+        if schema.type_hints[fieldName] == bool:  # not parse_val(), OptionsError would be logged
+            if argument_str_val in BOOL_STRINGS:
+                return BOOL_STRINGS[argument_str_val]
+            report.add_error(path, f"cannot parse '{argument_str_val}': Cannot parse bool from {argument_str_val}.")
+            return INVALID
+        try:
+            return parse_val(schema.type_hints[fieldName], argument_str_val)
+        except (OptionsError, TypeError, ValueError) as e:
+            report.add_error(path, f"cannot parse '{argument_str_val}': {e}")
+            return INVALID
+
+    if argument_str_val is None:
+        report.add_error(path, "expected one argument")
+        return INVALID
+
+    if argument_str_val == "None":
+        return None
+
+    if fieldName in schema.suboption_types:
+        return scan_suboption(schema.type_hints[fieldName], argument_str_val, report, path)
+
+    field_type = schema.type_hints[fieldName]
+    if fieldName in schema.union_fields:
+        return argument_str_val
+    try:
+        return field_type(argument_str_val)
+    except (TypeError, ValueError):
+        report.add_error(path, f"invalid {field_type.__name__} value: '{argument_str_val}'")
+        return INVALID
+
+
+def scan_variant_name(parsed_types, name: str, report: ValidationReport, path):
+    """
+    Non-raising counterpart of match_variant_by_name(), returns (None, None) if name is not found
+    or variants added by @variant fail their check on first use.
+    """
+    token = options_errors_quiet.set(True)
+    try:
+        target_type, variant_opts = match_variant_by_name(parsed_types, name)
+        if target_type is not None:
+            target_type.get_variants()  # checked also when matched by type name, get_suboption_name() uses them later
+    except OptionsError as e:
+        report.add_error(path, f"invalid variants of {parsed_types}: {e}")
+        return None, None
+    finally:
+        options_errors_quiet.reset(token)
+
+    if target_type is None:
+        report.add_error(path, f'{name} is not among types or variants permitted for {parsed_types}')
+    return target_type, variant_opts
+
+
+def scan_suboption(parsed_types, string: str, report: ValidationReport, path):
+    """
+    Non-raising counterpart of suboptionWrapper().
+    """
+    split = split_suboption_str(string)
+    if split is None:
+        report.add_error(path, f"unexpected suboption str : {string}. It starts or ends with ' sign. Suboption string should not contain spaces!")
+        return INVALID
+    name, args = split
+
+    if name == "None":
+        return None
+
+    target_type, variant_opts = scan_variant_name(parsed_types, name, report, path)
+    if target_type is None:
+        return INVALID
+
+    opts = target_type(**variant_opts)
+    errors_before = len(report.errors)
+    opts.set_fields(**scan_options(target_type, args.split(), report, path + "."))
+    if len(report.errors) != errors_before:
+        return INVALID
+    return opts
+
+
+class SuboptionValues:
+    """
+    Field values of a suboption parsed by canonical_values(), compared and formatted like the suboption options would be.
+    """
+    __slots__ = ("optionsType", "values")
+
+    def __init__(self, optionsType, values):
+        self.optionsType = optionsType
+        self.values = values
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, SuboptionValues):
+            return self.optionsType is __o.optionsType and self.values == __o.values
+        if isinstance(__o, OptionsBase):
+            return self.optionsType is type(__o) and self.values == vars(__o)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return " ".join(self.optionsType.option_format(k, v) for k, v in self.values.items())
+
+    def suboption_str(self) -> str:
+        name, values = get_suboption_name(self.optionsType, self.values)
+        if len(values) == 0:
+            return name
+        return "'" + name + "(" + ",".join(self.optionsType.suboption_field_format(k, v) for k, v in values.items()) + ")'"
+
+
+def canonical_values(optionsType: Type[T], splitted_opts, report: ValidationReport, path=""):
+    """
+    Same as scan_options(), but suboptions are returned as SuboptionValues instead of options.
+    """
+    schema = optionsType.get_schema()
+    values = dict()
+
+    for fieldName, argument_str_val in scan_flags(schema, splitted_opts, report, path):
+        value = canonical_value(schema, fieldName, argument_str_val, report, path)
+        if value is not INVALID:
+            values[fieldName] = value
+
+    return values
+
+
+def canonical_value(schema: OptionsSchema, fieldName, argument_str_val, report: ValidationReport, path=""):
+    if fieldName in schema.suboption_types and argument_str_val not in (None, "None"):
+        return scan_suboption_values(schema.type_hints[fieldName], argument_str_val, report, path + fieldName)
+
+    value = scan_value(schema, fieldName, argument_str_val, report, path + fieldName)
+    error = None if value is INVALID else schema.optionsType.get_constraints_error(fieldName, value)
+    if error is not None:
+        report.add_error(path + fieldName, error)
+        return INVALID
+    return value
+
+
+def scan_suboption_values(parsed_types, string: str, report: ValidationReport, path):
+    """
+    Same as scan_suboption(), but returns SuboptionValues instead of options.
+    """
+    split = split_suboption_str(string)
+    if split is None:
+        report.add_error(path, f"unexpected suboption str : {string}. It starts or ends with ' sign. Suboption string should not contain spaces!")
+        return INVALID
+    name, args = split
+
+    if name == "None":
+        return None
+
+    target_type, variant_opts = scan_variant_name(parsed_types, name, report, path)
+    if target_type is None:
+        return INVALID
+
+    values = dict(target_type.get_schema().defaults)
+    values.update(variant_opts)
+    errors_before = len(report.errors)
+    values.update(canonical_values(target_type, args.split(), report, path + "."))
+    if len(report.errors) != errors_before:
+        return INVALID
+    return SuboptionValues(target_type, values)
+
+
+def check_options(optionsType: Type[T], options: typing.Mapping[str, Any], report: ValidationReport, path=""):
+    """
+    Checks field values from options mapping without raising, nested suboptions are checked recursively.
+    Problems are added to report, returns dict of values of the fields that passed the checks.
+    """
+    values = dict()
+    for fieldName, value in options.items():
+        error = optionsType.get_constraints_error(fieldName, value)
+        if error is not None:
+            report.add_error(path + fieldName, error)
+            continue
+
+        if isinstance(value, OptionsBase):
+            errors_before = len(report.errors)
+            check_options(type(value), vars(value), report, path + fieldName + ".")
+            if len(report.errors) != errors_before:
+                continue
+
+        values[fieldName] = value
+
+    return values
+
+
+def split_file_chunks(path, chunk_bytes):
+    """
+    Splits file into (start, end) byte ranges of about chunk_bytes size, ranges end on line boundaries.
+    """
+    chunks = []
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        start = 0
+        while start < size:
+            f.seek(start + max(chunk_bytes, 1) - 1)
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def parse_file_chunk(optionsType: Type[T], path, chunk, encoding="utf-8"):
+    """
+    Parses lines of the file in chunk byte range, see OptionParser.parse_file_parallel().
+    Parsed options are returned in the compact form of OptionsBase.get_field_values().
+    """
+    start, end = chunk
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).decode(encoding).split('\n')
+    if lines[-1] == '':
+        lines.pop()
+
+    return parse_lines(optionsType, lines)
+
+
+def parse_line(optionsType: Type[T], line: str):
+    """
+    Parses options string without raising or logging, returns (options or None, errors as in ValidationReport.errors).
+    Lines rejected by OptionsBase.validate() or with repeated fields are parsed again with OptionParser.parse_opts(),
+    which also accepts e.g. --W=4, abbreviated flags and stray values. If that fails too, errors of validate() are returned,
+    followed by the error of parse_opts() if it is not OptionsError.
+    """
+    report = optionsType.validate(line)
+    splitted = line.split()
+    if report.ok and not repeats_fields(optionsType.get_schema(), report.values, splitted):
+        return optionsType(**report.values), []
+
+    if "-h" in splitted or "--help" in splitted:
+        return None, report.errors
+
+    token = options_errors_quiet.set(True)
+    try:
+        return OptionParser.parse_opts(optionsType, options_str=line), []
+    except OptionsError:
+        return None, report.errors
+    except (Exception, SystemExit) as e:
+        return None, report.errors + [("", f"{type(e).__name__}: {e}")]
+    finally:
+        options_errors_quiet.reset(token)
+
+
+def repeats_fields(schema: OptionsSchema, values, splitted_opts) -> bool:
+    """
+    True if values scanned from splitted_opts could differ from parsing with ArgumentParser because a field is passed more than once.
+    ArgumentParser keeps the last value, except that explicit values of action fields override their flags passed without values.
+    """
+    return len(values) != sum(s in schema.flags for s in splitted_opts)
+
+
+def parse_lines(optionsType: Type[T], lines):
+    """
+    Parses options strings with parse_line(), i.e. without raising or logging.
+    Parsed options are returned in the compact form of OptionsBase.get_field_values(), see unpack_parsed_lines().
+    """
+    results = []
+    for line in lines:
+        options, errors = parse_line(optionsType, line)
+        results.append((None if options is None else options.get_field_values(), errors))
+    return results
+
+
+def unpack_parsed_lines(optionsType: Type[T], parsed_lines):
+    """
+    Converts results of parse_lines() into (options, errors) pairs.
+    """
+    return [(None if values is None else optionsType.from_field_values(values), errors)
+            for values, errors in parsed_lines]
+
+
+class OptionParser(Generic[T]):
+
+    def __init__(self, optionsType: Type[T]) -> None:
+        self.optionsType = optionsType
+        self.argumentParser = OptionParser.create_argumentParser()
+        OptionParser.register_opts(self.argumentParser, self.optionsType)
+
+    @staticmethod
+    def create_argumentParser():
+        return OptionsArgumentParser(exit_on_error=False)
+
+    @staticmethod
+    def register_opts(argumentParser: ArgumentParser, optionsType: Type[T]):
+        for param, hint_type in optionsType.get_schema().type_hints.items():
+            name_or_flags, argparse_kwargs = getattr(optionsType, param)
+            argparse_kwargs = dict(argparse_kwargs)
+            lazy_help_type = None
+
+            if get_origin(hint_type) is types.UnionType:
+                if all(issubclass(t, OptionsBase) for t in get_args(hint_type)):
+                    suboption_parser = partial(suboptionWrapper, hint_type)
+                    argparse_kwargs['type'] = suboption_parser
+                else:
+                    logger.error(f'not all types of {hint_type} are subclasses of {OptionsBase}')
+
+            elif issubclass(hint_type, OptionsBase):
+                suboption_parser = partial(suboptionWrapper, hint_type)
+                argparse_kwargs['type'] = suboption_parser
+                if isinstance(argumentParser, OptionsArgumentParser):
+                    lazy_help_type = hint_type
+                else:
+                    argparse_kwargs['help'] = argparse_kwargs.get('help', '') + hint_type.get_variants_help()
+            elif 'action' not in argparse_kwargs:
+                argparse_kwargs['type'] = hint_type
+
+            action = argumentParser.add_argument(f"--{param}", *name_or_flags, **argparse_kwargs)
+            if lazy_help_type is not None:
+                argumentParser.variants_help_types[action] = lazy_help_type
+
+    def instance_parse_opts(self, options_str: str = None) -> T:
+        return OptionParser.parse_opts(self.optionsType,
+                                       argumentParser=self.argumentParser,
+                                       options_str=options_str)
+
+    @staticmethod
+    def parse_opts(optionsType: Type[T], *, argumentParser: ArgumentParser = None, options_str: str = None) -> T:
+        """
+            Creates options from options_str.
+
+            :param argumentParser: If not None, must have options already registered
+                                   via OptionParser.register_opts(argumentParser, optionsType)
+            :param options_str: If not None, options are parsed from options_str
+                                If None, options are parsed from the script arguments
+        """
+        options = optionsType()
+        OptionParser.parse_into(options, argumentParser=argumentParser, options_str=options_str)
+        return options
+
+    @staticmethod
+    def parse_file_parallel(optionsType: Type[T], path, *, workers: int = None, chunk_bytes: int = 1 << 22, encoding="utf-8"):
+        """
+        Parses file with one options string per line in a pool of processes.
+        Lines are parsed like OptionParser.parse_opts(), but without raising or logging, see parse_line().
+
+        :param workers: number of processes, os.cpu_count() if None. File is parsed in this process if workers is 1.
+        :param chunk_bytes: approximate size of the part of the file parsed by one task
+        :return: list of (options, errors) pairs in order of lines, options are None if the line has errors
+                 and errors is a list of (field path, message) as in ValidationReport.errors.
+        """
+        chunks = split_file_chunks(path, chunk_bytes)
+        task = partial(parse_file_chunk, optionsType, path, encoding=encoding)
+
+        if workers == 1 or len(chunks) <= 1:
+            parsed_chunks = list(map(task, chunks))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed_chunks = list(executor.map(task, chunks))
+
+        return [result for parsed_chunk in parsed_chunks for result in unpack_parsed_lines(optionsType, parsed_chunk)]
+
+    @staticmethod
+    async def aiter_stream(optionsType: Type[T], reader: "asyncio.StreamReader", **kwargs):
+        """
+        Parses lines read from reader until EOF, see OptionParser.aiter_lines():
+
+            async for options, errors in OptionParser.aiter_stream(ExampleOptions, reader):
+                ...
+        """
+        async for result in OptionParser.aiter_lines(optionsType, reader.readline, **kwargs):
+            yield result
+
+    @staticmethod
+    async def aiter_queue(optionsType: Type[T], queue: "asyncio.Queue", **kwargs):
+        """
+        Parses options strings taken from queue until None is taken, see OptionParser.aiter_lines().
+        """
+        async for result in OptionParser.aiter_lines(optionsType, queue.get, **kwargs):
+            yield result
+
+    @staticmethod
+    async def aiter_lines(optionsType: Type[T], read, *, executor=None, batch_size: int = 256, batch_timeout: float = 0.005,
+                          max_pending_batches: int = 4, encoding="utf-8"):
+        """
+        Asynchronously parses options strings returned by read() in batches in executor, so that the event loop is not blocked.
+        Lines are parsed like OptionParser.parse_opts(), but without raising or logging, see parse_line().
+
+        :param read: coroutine function returning next options string (str or bytes), None or empty string at the end.
+                     It must be safe to cancel, as asyncio.StreamReader.readline and asyncio.Queue.get are.
+        :param executor: If None, the default executor of the event loop is used.
+                         With ProcessPoolExecutor optionsType must be picklable.
+        :param batch_size: maximal number of lines parsed in one executor call
+        :param batch_timeout: batch is parsed when the next line does not come in batch_timeout seconds
+        :param max_pending_batches: maximal number of batches read ahead, reading waits until they are consumed
+        :return: async iterator of (options, errors) pairs in order of lines, see OptionParser.parse_file_parallel().
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize=max_pending_batches)
+
+        async def produce():
+            try:
+                end = False
+                while not end:
+                    batch = []
+                    while len(batch) < batch_size:
+                        try:
+                            line = await (read() if not batch else asyncio.wait_for(read(), batch_timeout))
+                        except asyncio.TimeoutError:
+                            break
+                        if not line:
+                            end = True
+                            break
+                        batch.append(line.decode(encoding) if isinstance(line, bytes) else line)
+
+                    if batch:
+                        await pending.put(loop.run_in_executor(executor, parse_lines, optionsType, batch))
+            except Exception as e:
+                await pending.put(e)
+            await pending.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while (parsed_batch := await pending.get()) is not None:
+                if isinstance(parsed_batch, Exception):
+                    raise parsed_batch
+                for result in unpack_parsed_lines(optionsType, await parsed_batch):
+                    yield result
+        finally:
+            producer.cancel()
+
+    @staticmethod
+    async def aparse_many(optionsType: Type[T], lines: typing.Iterable[str], *, executor=None, batch_size: int = 256,
+                          max_pending_batches: int = 4):
+        """
+        Parses options strings in batches in executor, at most max_pending_batches batches at once.
+        Returns list of (options, errors) pairs in order of lines, see OptionParser.aiter_lines().
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_pending_batches)
+
+        async def parse_batch(batch):
+            async with semaphore:
+                return await loop.run_in_executor(executor, parse_lines, optionsType, batch)
+
+        lines = list(lines)
+        parsed_batches = await asyncio.gather(*(parse_batch(lines[i:i + batch_size])
+                                                for i in range(0, len(lines), batch_size)))
+        return [result for parsed_batch in parsed_batches for result in unpack_parsed_lines(optionsType, parsed_batch)]
+
+    @staticmethod
+    def parse_columns(optionsType: Type[T], lines: typing.Iterable[str], fields: typing.Iterable[str] = None, use_numpy=True):
+        """
+        Parses values of fields from options strings into columns, one row per line, without creating options:
+
+            columns, errors = OptionParser.parse_columns(ExampleOptions, lines, fields=['W', 'net', 'method'])
+            columns['W'].values  # numpy array of int64, columns['W'].nulls marks None values
+
+        Values are converted and checked like in OptionsBase.validate(), values of other fields are skipped unchecked.
+        Suboption fields are represented by the names their values have in options strings, e.g. 'MethodA(abool=True,aint=1)'
+        by the matching variant name A1, their arguments are checked too.
+
+        :param fields: names of parsed fields, all fields if None
+        :param use_numpy: If True and numpy is installed, columns hold numpy arrays, otherwise array.array
+        :return: (columns, errors), columns maps field names to ArrayColumn for bool, int and float fields and to DictionaryColumn
+                 for others and for int fields with values out of int64 range.
+                 errors is a list of (row, errors as in ValidationReport.errors), all values of such rows are None.
+        """
+        schema = optionsType.get_schema()
+        fields = schema.fields if fields is None else tuple(fields)
+        for fieldName in fields:
+            if fieldName not in schema.type_hints:
+                raise OptionsError(f"{fieldName} is not among {optionsType.__name__} type fields: {[*schema.type_hints]}")
+
+        columns = {fieldName: new_column(schema.type_hints[fieldName]) for fieldName in fields}
+        defaults = dict()
+        for fieldName in fields:
+            default = schema.defaults[fieldName]
+            defaults[fieldName] = default.get_suboption_name()[0] if isinstance(default, OptionsBase) else default
+
+        # field name -> value string -> (value, errors), values repeat in logged options strings. Bounded like canonicalize() cache
+        converted = {fieldName: dict() for fieldName in fields}
+
+        errors = []
+        for row, line in enumerate(lines):
+            report = ValidationReport(optionsType)
+            row_values = dict(defaults)
+            for fieldName, argument_str_val in scan_flags(schema, line.split(), report):
+                field_converted = converted.get(fieldName)
+                if field_converted is None:
+                    continue
+
+                if argument_str_val not in field_converted:
+                    if len(field_converted) >= CANONICAL_CACHE_SIZE:
+                        field_converted.clear()
+                    value_report = ValidationReport(optionsType)
+                    value = canonical_value(schema, fieldName, argument_str_val, value_report)
+                    if isinstance(value, SuboptionValues):  # named like defaults, e.g. 'MethodA(abool=True,aint=1)' as A1
+                        value = get_suboption_name(value.optionsType, value.values)[0]
+                    field_converted[argument_str_val] = (value, value_report.errors)
+
+                value, value_errors = field_converted[argument_str_val]
+                if value_errors:
+                    report.errors.extend(value_errors)
+                else:
+                    row_values[fieldName] = value
+
+            if report.errors:
+                errors.append((row, report.errors))
+                for column in columns.values():
+                    column.append(None)
+            else:
+                for fieldName, column in columns.items():
+                    try:
+                        column.append(row_values[fieldName])
+                    except OverflowError:  # int out of int64 range
+                        columns[fieldName] = column.to_dictionary()
+                        columns[fieldName].append(row_values[fieldName])
+
+        if use_numpy:
+            try:
+                import numpy
+            except ImportError:
+                numpy = None
+            if numpy is not None:
+                for column in columns.values():
+                    column.to_numpy(numpy)
+        return columns, errors
+
+    @staticmethod
+    def parse_into(options: OptionsBase, *, argumentParser: ArgumentParser = None,  options_str: str = None):
+        """
+        Sets only fields contained in options_str.
+        """
+        start = parser_stats.start()
+        if options_str is None:
+            splitted = sys.argv[1:]
+        else:
+            splitted = options_str.split()
+        start = parser_stats.lap("tokenization", start)
+
+        if argumentParser is None:
+            native_fields = OptionParser.parse_native(type(options), splitted)
+            if native_fields is not None:
+                for k, v in native_fields.items():  # not set_fields(**native_fields), that copies the dict of all fields
+                    options.__setattr__(k, v)
+                parser_stats.lap("native parse", start)
+                return
+
+            argumentParser = OptionParser.create_argumentParser()
+            OptionParser.register_opts(argumentParser, type(options))
+            start = parser_stats.lap("argparse construction", start)
+
+        argparse_compatible_opts, additional_opts = process_arguments(type(options), splitted)
+        argparse_compatible_opts_str = " ".join(argparse_compatible_opts)
+        start = parser_stats.lap("process_arguments", start)
+
+        try:
+            parsed_by_argparse = argumentParser.parse_args(argparse_compatible_opts)
+        except argparse.ArgumentError as e:
+            raise OptionsError(f"Failed to parse '{argparse_compatible_opts_str}' with argumentParser: {e}") from e
+        start = parser_stats.lap("argparse parse_args", start)
+
+        parsed_fields = dict()
+        for k, v in vars(parsed_by_argparse).items():
             names = get_all_names(type(options), k)
             if any([n in argparse_compatible_opts_str for n in names]):
-                options.__setattr__(k, v)
+                parsed_fields[k] = v
+        start = parser_stats.lap("get_all_names reconciliation", start)
+
+        options.set_fields(**parsed_fields)
+        options.set_fields(**additional_opts)
+        parser_stats.lap("__setattr__ validation", start)
+
+    @staticmethod
+    def parse_native(optionsType: Type[T], splitted_opts) -> typing.Dict[str, Any] | None:
+        """
+        Parses splitted_opts without constructing ArgumentParser.
+        Returns None if the result could differ from parsing with ArgumentParser,
+        e.g. for -h/--help, abbreviated or repeated options and any errors, so that ArgumentParser reports them.
+        """
+        schema = optionsType.get_schema()
+        if not schema.native_parsable:
+            return None
+
+        report = ValidationReport(optionsType)
+        values = scan_options(optionsType, splitted_opts, report)
+        if not report.ok or repeats_fields(schema, values, splitted_opts):
+            return None
+        return values
+
+    @staticmethod
+    def stats():
+        """
+        Returns counters and cumulative timings in seconds collected while profiling is enabled, see OptionParser.profile().
+        """
+        return parser_stats.as_dict()
+
+    @staticmethod
+    @contextmanager
+    def profile(reset=True):
+        """
+        Context manager that enables collection of parsing statistics:
+
+            with OptionParser.profile() as stats:
+                ExampleOptions.parse_args("-W 4")
+            print(stats.as_dict())
+
+        :param reset: If True, statistics collected before are discarded.
+        """
+        enabled = parser_stats.enabled
+        if reset:
+            parser_stats.reset()
+        parser_stats.enabled = True
+        try:
+            yield parser_stats
+        finally:
+            parser_stats.enabled = enabled
+
+
+class OptionsArgumentParser(ArgumentParser):
+    """
+    ArgumentParser created by OptionParser, help of suboption fields is extended with their variants
+    only when the help is formatted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.variants_help_types = dict()  # action -> OptionsBase derived type
+        self.help_lock = threading.Lock()
+
+    def format_help(self):
+        with self.help_lock:
+            for action, hint_type in self.variants_help_types.items():
+                action.help = (action.help or '') + hint_type.get_variants_help()
+            self.variants_help_types.clear()
+        return super().format_help()
+
+
+class SharedFieldLayout:
+    """
+    Position and encoding of one field in a SharedOptionsStore record.
+    Each field takes a tag byte (see SharedOptionsStore) followed by its value:
+    bool, int and float fields are stored inline, other fields as (offset, size) of bytes in the heap.
+    """
+    INLINE_FORMATS = {bool: "?", int: "q", float: "d"}
+    HEAP_REF = struct.Struct("<II")
+    SIZE = 9
+
+    def __init__(self, fieldName, field_type, offset):
+        self.fieldName = fieldName
+        self.field_type = field_type
+        self.offset = offset
+        value_format = self.INLINE_FORMATS.get(field_type)
+        self.inline = None if value_format is None else struct.Struct("<" + value_format)
+
+
+class SharedOptionsStore(Generic[T]):
+    """
+    Options of one type written once into shared memory and read without copying by other processes.
+
+    Memory starts with HEADER, followed by fixed size records of all options and the heap with strings
+    and pickled values. Record layout is derived from the schema of options type, see SharedFieldLayout.
+    Items of the store are read-only SharedOptionsView objects, that decode fields on access.
+    """
+    HEADER = struct.Struct("<4sIQQQ")  # magic, schema fingerprint, number of records, record size, heap offset
+    MAGIC = b"OPTS"
+    TAG_NONE, TAG_INLINE, TAG_STR, TAG_PICKLE = range(4)
+
+    def __init__(self, optionsType: Type[T], shm: "shared_memory.SharedMemory"):
+        self.optionsType = optionsType
+        self.shm = shm
+        self.layouts = SharedOptionsStore.get_layouts(optionsType)
+        self.buf = shm.buf.toreadonly()
+
+        magic, fingerprint, self.count, self.record_size, self.heap_offset = self.HEADER.unpack_from(self.buf)
+        if magic != self.MAGIC:
+            raise OptionsError(f"Shared memory {shm.name} does not contain options.")
+        if fingerprint != optionsType.get_schema().fingerprint:
+            raise OptionsError(f"Options in shared memory {shm.name} do not match {optionsType.__name__} fields: {[*optionsType.get_schema().type_hints]}")
+
+    @staticmethod
+    def get_layouts(optionsType) -> typing.Dict[str, SharedFieldLayout]:
+        layouts = dict()
+        offset = 0
+        for fieldName, field_type in optionsType.get_schema().type_hints.items():
+            layouts[fieldName] = SharedFieldLayout(fieldName, field_type, offset)
+            offset += SharedFieldLayout.SIZE
+        return layouts
+
+    @classmethod
+    def create(cls, optionsType: Type[T], options: typing.Iterable[T], name: str = None) -> "SharedOptionsStore[T]":
+        """
+        Writes options into new shared memory block. The caller is responsible for unlink() when the store is not needed.
+        """
+        layouts = SharedOptionsStore.get_layouts(optionsType)
+        record_size = SharedFieldLayout.SIZE * len(layouts)
+        records = bytearray()
+        heap = bytearray()
+        count = 0
+
+        for o in options:
+            if type(o) is not optionsType:
+                raise OptionsError(f"{type(o).__name__} can not be stored in SharedOptionsStore of {optionsType.__name__}.")
+            record = bytearray(record_size)
+            for fieldName, value in vars(o).items():
+                cls.encode_field(layouts[fieldName], value, record, heap)
+            records += record
+            count += 1
+
+        heap_offset = cls.HEADER.size + len(records)
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name, create=True, size=heap_offset + len(heap))
+        try:
+            cls.HEADER.pack_into(shm.buf, 0, cls.MAGIC, optionsType.get_schema().fingerprint, count, record_size, heap_offset)
+            shm.buf[cls.HEADER.size:heap_offset] = records
+            shm.buf[heap_offset:heap_offset + len(heap)] = heap
+            return cls(optionsType, shm)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def encode_field(cls, layout: SharedFieldLayout, value, record: bytearray, heap: bytearray):
+        if value is None:
+            record[layout.offset] = cls.TAG_NONE
+            return
+
+        if layout.inline is not None and type(value) is layout.field_type:
+            try:
+                layout.inline.pack_into(record, layout.offset + 1, value)
+                record[layout.offset] = cls.TAG_INLINE
+                return
+            except struct.error:
+                pass  # int out of int64 range is pickled
+
+        if type(value) is str:
+            tag, data = cls.TAG_STR, value.encode()
+        else:
+            import pickle
+            tag, data = cls.TAG_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        record[layout.offset] = tag
+        SharedFieldLayout.HEAP_REF.pack_into(record, layout.offset + 1, len(heap), len(data))
+        heap += data
+
+    @classmethod
+    def attach(cls, optionsType: Type[T], name: str) -> "SharedOptionsStore[T]":
+        """
+        Opens the store created by SharedOptionsStore.create() in another process.
+        """
+        from multiprocessing import shared_memory
+        # only the creating process owns the block, see SharedOptionsStore.unlink()
+        # python < 3.13 has no track argument, child processes there share the resource tracker of their parent.
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(optionsType, shm)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> "SharedOptionsView":
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"SharedOptionsStore index {index} out of range.")
+        return SharedOptionsView(self, index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield SharedOptionsView(self, index)
+
+    def get_field(self, index: int, fieldName: str):
+        layout = self.layouts[fieldName]
+        offset = self.HEADER.size + index * self.record_size + layout.offset
+        tag = self.buf[offset]
+
+        if tag == self.TAG_NONE:
+            return None
+        if tag == self.TAG_INLINE:
+            return layout.inline.unpack_from(self.buf, offset + 1)[0]
+
+        start, size = SharedFieldLayout.HEAP_REF.unpack_from(self.buf, offset + 1)
+        data = self.buf[self.heap_offset + start:self.heap_offset + start + size]
+        if tag == self.TAG_STR:
+            return str(data, "utf-8")
+        import pickle
+        return pickle.loads(data)
+
+    def get_options(self, index: int) -> T:
+        """
+        Decodes all fields of the options with given index into a new OptionsBase instance.
+        """
+        return new_options_unchecked(self.optionsType, {k: self.get_field(index, k) for k in self.layouts})
+
+    def close(self):
+        """
+        Detaches from shared memory, views of the store can not be used afterwards.
+        """
+        self.buf.release()
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Frees shared memory block, should be called once by the process that created the store.
+        """
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedOptionsView:
+    """
+    Read-only options in SharedOptionsStore, fields are decoded from shared memory on every access.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: SharedOptionsStore, index: int):
+        object.__setattr__(self, "store", store)
+        object.__setattr__(self, "index", index)
+
+    def __getattr__(self, name):
+        if name not in self.store.layouts:
+            raise AttributeError(f"{self.store.optionsType.__name__} has no field {name}")
+        return self.store.get_field(self.index, name)
+
+    def __setattr__(self, name, value):
+        raise OptionsError("Options in SharedOptionsStore are read-only, use to_options() to get a modifiable copy.")
+
+    def to_options(self):
+        return self.store.get_options(self.index)
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, SharedOptionsView):
+            __o = __o.to_options()
+        return self.to_options() == __o
+
+    def __str__(self) -> str:
+        return str(self.to_options())
+
+
+class OptionsFile(Generic[T]):
+    """
+    Random access to a text file with one options string per line, e.g. written with str(options).
+
+    Line start offsets are kept in an index file next to the file, lines appended to the file are
+    indexed on refresh(). Only the requested lines are read from the memory mapped file and parsed.
+    The index is rebuilt if the file changed in another way than by appending lines, or if a line read
+    with it does not start and end at a line boundary.
+    """
+    # magic, number of offsets, end of the last indexed line, crc32 of bytes before it,
+    # size, mtime_ns and inode of the indexed file
+    INDEX_HEADER = struct.Struct("<4sQQIQqQ")
+    INDEX_MAGIC = b"OPT3"
+    CHECK_BYTES = 64
+
+    def __init__(self, optionsType: Type[T], path, index_path=None, encoding="utf-8"):
+        """
+        :param index_path: If None, index is stored in path + ".idx".
+        """
+        self.optionsType = optionsType
+        self.path = os.fspath(path)
+        self.index_path = self.path + ".idx" if index_path is None else os.fspath(index_path)
+        self.encoding = encoding
+        self.mm = None
+        self.size = 0
+        self.starts = array('Q')  # start offsets of lines ending with a newline
+        self.end = 0              # end of the last line ending with a newline
+        self.check = 0            # crc32 of bytes before end, detects changes other than appending lines
+        self.stat_key = None      # (size, mtime_ns, inode) of the indexed version of the file
+        self.load_index()
+        self.refresh()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, count, end, check, *stat_key = self.INDEX_HEADER.unpack(f.read(self.INDEX_HEADER.size))
+                starts = array('Q', f.read())
+        except (OSError, struct.error, ValueError):
+            return
+
+        if magic == self.INDEX_MAGIC and len(starts) == count:
+            self.starts, self.end, self.check, self.stat_key = starts, end, check, tuple(stat_key)
+
+    def save_index(self):
+        """
+        Writes index to a temporary file that replaces the index file, so that other processes never read a partial index.
+        """
+        import tempfile
+
+        header = self.INDEX_HEADER.pack(self.INDEX_MAGIC, len(self.starts), self.end, self.check, *self.stat_key)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.index_path) + ".",
+                                            dir=os.path.dirname(os.path.abspath(self.index_path)))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(self.starts.tobytes())
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Index of {self.path} is not saved to {self.index_path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_check(self, end):
+        if self.mm is None:
+            return 0
+        return zlib.crc32(self.mm[max(end - self.CHECK_BYTES, 0):end])
+
+    def is_appended(self, stat_key) -> bool:
+        """
+        True if the indexed version of the file can be the beginning of the mapped file with stat_key.
+        """
+        if self.stat_key is None:
+            return False
+        size, _, inode = stat_key
+        indexed_size, _, indexed_inode = self.stat_key
+        return (inode == indexed_inode and size > indexed_size and self.end <= indexed_size and
+                self.check == self.get_check(self.end) and (self.end == 0 or self.mm[self.end - 1] == ord('\n')))
+
+    def refresh(self, rebuild=False):
+        """
+        Maps the file again if its size, modification time or inode changed and indexes appended lines.
+        If the file changed in another way than by appending, whole index is rebuilt.
+        """
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            stat_key = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if self.mm is not None and stat_key == self.stat_key and not rebuild:
+                return
+
+            self.close()
+            self.size = st.st_size
+            if self.size > 0:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if rebuild or (stat_key != self.stat_key and not self.is_appended(stat_key)):
+            logger.debug(f"{self.path} was modified, rebuilding index.")
+            self.starts = array('Q')
+            self.end = 0
+        self.stat_key = stat_key
+
+        pos = self.end
+        while self.mm is not None:
+            newline = self.mm.find(b'\n', pos)
+            if newline == -1:
+                break
+            self.starts.append(pos)
+            pos = newline + 1
+
+        self.end = pos
+        self.check = self.get_check(self.end)
+        self.save_index()
+
+    def __len__(self) -> int:
+        return len(self.starts) + (1 if self.size > self.end else 0)
+
+    def get_line(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"OptionsFile line {index} out of range.")
+
+        start, stop = self.line_bounds(index)
+        if not self.is_line(start, stop):
+            logger.debug(f"Index of {self.path} does not match the file, rebuilding index.")
+            self.refresh(rebuild=True)
+            if not 0 <= index < len(self):
+                raise IndexError(f"OptionsFile line {index} out of range.")
+            start, stop = self.line_bounds(index)
+        return self.mm[start:stop].decode(self.encoding).rstrip('\r\n')
+
+    def line_bounds(self, index: int):
+        if index < len(self.starts):
+            return self.starts[index], self.starts[index + 1] if index + 1 < len(self.starts) else self.end
+        return self.end, self.size
+
+    def is_line(self, start: int, stop: int) -> bool:
+        """
+        True if start follows a newline and the line ends with the only newline in it or at the end of the file.
+        """
+        mm = self.mm
+        if stop > len(mm) or (start > 0 and mm[start - 1] != ord('\n')):
+            return False
+        newline = mm.find(b'\n', start, stop)
+        return newline == (stop - 1 if stop < len(mm) or mm[stop - 1] == ord('\n') else -1)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return OptionParser.parse_opts(self.optionsType, options_str=self.get_line(index))
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConfigDiff(Generic[T]):
+    """
+    Changes of configs between two ConfigFileWatcher.reload() calls.
+    Options are None for lines that failed to parse, their errors are in errors.
+    """
+
+    def __init__(self):
+        self.added = []     # (index of line in the new file, options)
+        self.removed = []   # (index of line in the old file, options)
+        self.modified = []  # (index of line in the new file, old options, new options)
+        self.errors = []    # (index of line in the new file, errors as in ValidationReport.errors) of added and modified lines
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def __str__(self) -> str:
+        return f"ConfigDiff(added={len(self.added)}, removed={len(self.removed)}, modified={len(self.modified)})"
+
+
+class ConfigFileWatcher(Generic[T]):
+    """
+    Options parsed from a text file with one options string per line, e.g. a sweep file that is edited while it is used.
+
+    The file is considered changed when its modification time, size or inode changes. On reload() lines are compared
+    by hashes with the previous version and only added or changed lines are parsed with parse_line(),
+    i.e. without raising or logging. Lines that were only moved keep their options instances.
+    """
+
+    def __init__(self, optionsType: Type[T], path, encoding="utf-8"):
+        self.optionsType = optionsType
+        self.path = os.fspath(path)
+        self.encoding = encoding
+        self.stat_key = None  # (mtime, size, inode) of the loaded version of the file
+        self.hashes = []      # hash of each line
+        self.configs = []     # (options, errors) of each line, see OptionParser.parse_file_parallel()
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [options for options, _ in self.configs[index]]
+        return self.configs[index][0]
+
+    def changed(self) -> bool:
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino) != self.stat_key
+
+    def parse_line(self, line: bytes):
+        return parse_line(self.optionsType, line.decode(self.encoding).rstrip('\r'))
+
+    def reload(self, force=False) -> ConfigDiff[T]:
+        """
+        Reads the file if it changed since the last reload, the first reload reports all lines as added.
+
+        :param force: If True, the file is read even if its modification time and size did not change.
+        """
+        diff = ConfigDiff()
+        if not force and not self.changed():
+            return diff
+
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            lines = f.read().split(b'\n')
+        if lines[-1] == b'':
+            lines.pop()
+        self.stat_key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        hashes = list(map(hash, lines))
+
+        # only the part between common first and last lines is compared and parsed
+        old_hashes = self.hashes
+        prefix = 0
+        max_common = min(len(old_hashes), len(hashes))
+        while prefix < max_common and old_hashes[prefix] == hashes[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < max_common - prefix and old_hashes[-1 - suffix] == hashes[-1 - suffix]:
+            suffix += 1
+
+        old_middle = old_hashes[prefix:len(old_hashes) - suffix]
+        new_middle = hashes[prefix:len(hashes) - suffix]
+        old_configs = self.configs[prefix:len(self.configs) - suffix]
+        new_configs = []
+
+        import difflib
+        opcodes = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False).get_opcodes()
+
+        # moved lines reuse options of removed or replaced lines, each of them at most once
+        reusable = dict()
+        for tag, i1, i2, _, _ in opcodes:
+            if tag != 'equal':
+                for i in range(i1, i2):
+                    reusable.setdefault(old_middle[i], []).append(old_configs[i])
+
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                new_configs.extend(old_configs[i1:i2])
+                continue
+
+            parsed = []
+            for j in range(j1, j2):
+                candidates = reusable.get(new_middle[j])
+                config = candidates.pop() if candidates else self.parse_line(lines[prefix + j])
+                if config[0] is None:
+                    diff.errors.append((prefix + j, config[1]))
+                parsed.append(config)
+            new_configs.extend(parsed)
+
+            paired = min(i2 - i1, j2 - j1)
+            for k in range(paired):
+                old_options, new_options = old_configs[i1 + k][0], parsed[k][0]
+                if old_options != new_options or old_options is None:
+                    diff.modified.append((prefix + j1 + k, old_options, new_options))
+            diff.removed.extend((prefix + i, old_configs[i][0]) for i in range(i1 + paired, i2))
+            diff.added.extend((prefix + j, parsed[j - j1][0]) for j in range(j1 + paired, j2))
+
+        self.hashes = hashes
+        self.configs = self.configs[:prefix] + new_configs + self.configs[len(self.configs) - suffix:]
+        return diff
+
+    def watch(self, interval: float = 1.0):
+        """
+        Polls the file every interval seconds and yields ConfigDiff of every change, the first one contains all lines:
+
+            for diff in ConfigFileWatcher(ExampleOptions, "sweep.txt").watch():
+                ...
+        """
+        while True:
+            try:
+                diff = self.reload()
+            except FileNotFoundError:
+                diff = None  # the file is being replaced, e.g. by an editor
+            if diff:
+                yield diff
+            time.sleep(interval)
+
+
+def mix_hash(value) -> int:
+    """
+    64 bit hash of value with uniformly distributed bits (splitmix64 finalizer of hash(value)).
+    """
+    mask = 0xFFFFFFFFFFFFFFFF
+    h = hash(value) & mask
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & mask
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB & mask
+    return h ^ (h >> 31)
+
+
+class FieldSummary:
+    """
+    Statistics of values of one field in bounded memory.
+    Number of distinct values is estimated from sketch_size smallest value hashes (exact below sketch_size),
+    the most frequent values are tracked with the Space-Saving algorithm in top_capacity counters.
+    """
+
+    def __init__(self, top_capacity=32, sketch_size=256):
+        self.count = 0
+        self.first = None
+        self.constant = True
+        self.top_capacity = top_capacity
+        self.sketch_size = sketch_size
+        self.counters = dict()   # value -> count, counts of values that replaced others are overestimated
+        self.sketch = []         # max-heap of the smallest hashes, stored negated
+        self.sketch_members = set()
+
+    def add(self, value):
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+
+        if self.count == 0:
+            self.first = value
+        elif self.constant and (type(value) is not type(self.first) or value != self.first):
+            self.constant = False
+        self.count += 1
+
+        if value in self.counters:
+            self.counters[value] += 1
+        elif len(self.counters) < self.top_capacity:
+            self.counters[value] = 1
+        else:
+            replaced = min(self.counters, key=self.counters.__getitem__)
+            self.counters[value] = self.counters.pop(replaced) + 1
+
+        h = mix_hash(value)
+        if h in self.sketch_members:
+            return
+        if len(self.sketch) < self.sketch_size:
+            heapq.heappush(self.sketch, -h)
+            self.sketch_members.add(h)
+        elif h < -self.sketch[0]:
+            self.sketch_members.remove(-heapq.heapreplace(self.sketch, -h))
+            self.sketch_members.add(h)
+
+    @property
+    def distinct(self) -> int:
+        if len(self.sketch) < self.sketch_size:
+            return len(self.sketch)
+        return round((self.sketch_size - 1) * 2**64 / -self.sketch[0])
+
+    def top(self, n=10):
+        """
+        Returns up to n (value, count) pairs of the most frequent values.
+        """
+        return sorted(self.counters.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def as_dict(self, n=10):
+        return {"count": self.count, "constant": self.constant, "distinct": self.distinct, "top": self.top(n)}
+
+
+class OptionsSummary(Generic[T]):
+    """
+    Single pass summary of values of all fields over a stream of options, e.g. to find fields varying across runs.
+
+    Fields are identified by paths, fields of suboptions by path of the suboption field and the field name,
+    e.g. 'method.aint'. The value recorded for a suboption field is its variant or type name, see get_suboption_name().
+    """
+
+    def __init__(self, optionsType: Type[T], top_capacity=32, sketch_size=256):
+        self.optionsType = optionsType
+        self.top_capacity = top_capacity
+        self.sketch_size = sketch_size
+        self.count = 0
+        self.invalid = 0        # number of options strings that failed to parse, not counted in count
+        self.errors = []        # (options string, errors as in ValidationReport.errors) of the first top_capacity of them
+        self.fields = dict()    # path -> FieldSummary
+        self.layouts = dict()   # (path prefix, options type) -> [(field name, FieldSummary, nested path prefix)]
+
+    def add(self, options: T | str):
+        """
+        Adds options, or options string that is parsed as optionsType with parse_line().
+        Strings that fail to parse are counted in invalid instead of raising.
+        """
+        if isinstance(options, str):
+            line = options
+            options, errors = parse_line(self.optionsType, line)
+            if options is None:
+                self.invalid += 1
+                if len(self.errors) < self.top_capacity:
+                    self.errors.append((line, errors))
+                return
+        self.count += 1
+        self.add_fields(options, "")
+
+    def update(self, options: typing.Iterable[T | str]) -> "OptionsSummary[T]":
+        for o in options:
+            self.add(o)
+        return self
+
+    def get_layout(self, prefix, optionsType):
+        key = (prefix, optionsType)
+        if key not in self.layouts:
+            layout = []
+            for fieldName in optionsType.get_schema().fields:
+                path = prefix + fieldName
+                if path not in self.fields:
+                    self.fields[path] = FieldSummary(self.top_capacity, self.sketch_size)
+                layout.append((fieldName, self.fields[path], path + "."))
+            self.layouts[key] = layout
+        return self.layouts[key]
+
+    def add_fields(self, options: OptionsBase, prefix):
+        _vars = vars(options)
+        for fieldName, field_summary, nested_prefix in self.get_layout(prefix, type(options)):
+            value = _vars[fieldName]
+            if isinstance(value, OptionsBase):
+                field_summary.add(value.get_suboption_name()[0])
+                self.add_fields(value, nested_prefix)
+            else:
+                field_summary.add(value)
+
+    def varying(self):
+        """
+        Returns paths of fields that have not the same value in all options.
+        Fields of suboptions are also varying if they are missing in some options.
+        """
+        return [path for path, field_summary in self.fields.items()
+                if not field_summary.constant or field_summary.count != self.count]
+
+    def as_dict(self, n=10):
+        """
+        Returns summary of every field path: number of values, whether the value is constant, estimated number
+        of distinct values and up to n most frequent values with their counts.
+        """
+        return {path: field_summary.as_dict(n) for path, field_summary in self.fields.items()}
+
+
+def new_column(field_type):
+    if field_type in ArrayColumn.TYPECODES:
+        return ArrayColumn(field_type)
+    return DictionaryColumn()
+
+
+class ArrayColumn:
+    """
+    Values of a bool, int or float field, see OptionParser.parse_columns().
+    None values are stored as 0 and marked by 1 in nulls.
+    """
+    TYPECODES = {bool: 'B', int: 'q', float: 'd'}
+    NUMPY_DTYPES = {bool: 'bool', int: 'int64', float: 'float64'}
+
+    def __init__(self, field_type):
+        self.field_type = field_type
+        self.values = array(self.TYPECODES[field_type])
+        self.nulls = array('B')
+
+    def append(self, value):
+        if value is None:
+            self.values.append(0)
+            self.nulls.append(1)
+        else:
+            self.values.append(value)
+            self.nulls.append(0)
+
+    def to_dictionary(self) -> "DictionaryColumn":
+        """
+        Same values in a DictionaryColumn, which can hold values that do not fit the array type.
+        """
+        column = DictionaryColumn()
+        for value in self.to_list():
+            column.append(value)
+        return column
+
+    def to_numpy(self, numpy):
+        self.values = numpy.frombuffer(self.values, dtype=self.NUMPY_DTYPES[self.field_type])
+        self.nulls = numpy.frombuffer(self.nulls, dtype='bool')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row):
+        return None if self.nulls[row] else self.field_type(self.values[row])
+
+    def to_list(self) -> list:
+        return [self[row] for row in range(len(self))]
+
+
+class DictionaryColumn:
+    """
+    Dictionary encoded values of a field, see OptionParser.parse_columns().
+    Values are stored as codes, i.e. indices into categories in order of first appearance, None values as -1.
+    """
 
-        for k, v in additional_opts.items():
-            options.__setattr__(k, v)
+    def __init__(self):
+        self.codes = array('i')
+        self.categories = []
+        self.index = dict()  # value -> code
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+    def to_numpy(self, numpy):
+        self.codes = numpy.frombuffer(self.codes, dtype='int32')
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        code = self.codes[row]
+        return None if code == -1 else self.categories[code]
+
+    def to_list(self) -> list:
+        return [self[row] for row in range(len(self))]
@@ -0,0 +1,88 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import unittest
+
+from options import OptionParser, option, OptionsBase, variant
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+
+class MethodB(OptionsBase):
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true")
+    W: int = option("-W", default=3)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    method: MethodA|MethodB = option()
+
+
+lines = [str(ExampleOptions(W=i, method=MethodA(aint=i) if i % 2 else MethodB(bint=i))) for i in range(100)]
+
+
+class TestAsyncParsing(unittest.IsolatedAsyncioTestCase):
+    def check_results(self, results, expected_lines):
+        self.assertEqual(len(results), len(expected_lines))
+        for line, (options, errors) in zip(expected_lines, results):
+            self.assertEqual(errors, [])
+            self.assertEqual(options, ExampleOptions.parse_args(line))
+
+    async def test_aiter_stream(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data("".join(line + "\n" for line in lines).encode())
+        reader.feed_eof()
+
+        results = [r async for r in OptionParser.aiter_stream(ExampleOptions, reader, batch_size=7)]
+        self.check_results(results, lines)
+
+    async def test_aiter_stream_slow_writer(self):
+        reader = asyncio.StreamReader()
+
+        async def write():
+            for line in lines[:5]:
+                reader.feed_data((line + "\n").encode())
+                await asyncio.sleep(0.01)
+            reader.feed_eof()
+
+        writer = asyncio.create_task(write())
+        results = []
+        async for result in OptionParser.aiter_stream(ExampleOptions, reader, batch_size=100, batch_timeout=0.001):
+            results.append(result)
+            if len(results) == 1:
+                self.assertFalse(writer.done(), msg="first options should be parsed before the whole batch is read")
+        await writer
+        self.check_results(results, lines[:5])
+
+    async def test_aiter_queue_errors(self):
+        queue = asyncio.Queue()
+        for line in ["-W 1", "-W x", "--net net3", "--method A1", None]:
+            queue.put_nowait(line)
+
+        results = [r async for r in OptionParser.aiter_queue(ExampleOptions, queue, batch_size=2)]
+        self.assertEqual([options for options, _ in results],
+                         [ExampleOptions(W=1), None, None, ExampleOptions(method=MethodA(abool=True, aint=1))])
+        self.assertEqual([[path for path, _ in errors] for _, errors in results], [[], ["W"], ["net"], []])
+
+    async def test_read_error(self):
+        async def read():
+            raise ConnectionResetError()
+
+        with self.assertRaises(ConnectionResetError):
+            [r async for r in OptionParser.aiter_lines(ExampleOptions, read)]
+
+    async def test_aparse_many(self):
+        results = await OptionParser.aparse_many(ExampleOptions, lines, batch_size=9, max_pending_batches=2)
+        self.check_results(results, lines)
+
+    async def test_aparse_many_process_pool(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = await OptionParser.aparse_many(ExampleOptions, lines, executor=executor, batch_size=30)
+        self.check_results(results, lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
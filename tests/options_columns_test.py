@@ -0,0 +1,112 @@
+from array import array
+import importlib.util
+import unittest
+from unittest import mock
+from tests.test_utils import TestOptionsBase
+
+from options import OptionParser, OptionsError, option, OptionsBase, variant
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+
+class MethodB(OptionsBase):
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true")
+    W: int = option("-W", default=3)
+    lr: float = option(default=0.5)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    cnst: int = option("-c", action='store_const', const=42)
+    method: MethodA|MethodB = option()
+    method2: MethodB = option(default=MethodB(bint=2))
+
+
+class TestParseColumns(TestOptionsBase):
+    lines = ["-W 5 -t --lr 1 --method A1",
+             "--net net2 -c --method 'MethodA(aint=3)' --method2 MethodB",
+             "-W x --net net3",
+             "",
+             "--method None -W None --test False --cnst 7",
+             "-W -4 --lr -0.25 --net net2"]
+
+    def test_values(self):
+        columns, errors = OptionParser.parse_columns(ExampleOptions, self.lines, use_numpy=False)
+        self.assertEqual({k: c.to_list() for k, c in columns.items()}, {
+            "test": [True, False, None, False, False, False],
+            "W": [5, 3, None, 3, None, -4],
+            "lr": [1.0, 0.5, None, 0.5, 0.5, -0.25],
+            "net": ["net1", "net2", None, "net1", "net1", "net2"],
+            "cnst": [None, 42, None, None, 7, None],
+            "method": ["A1", "MethodA", None, None, None, None],
+            "method2": ["MethodB", "MethodB", None, "MethodB", "MethodB", "MethodB"],
+        })
+        self.assertEqual([(row, [path for path, _ in row_errors]) for row, row_errors in errors], [(2, ["W", "net"])])
+
+    def test_same_values_as_validate(self):
+        columns, errors = OptionParser.parse_columns(ExampleOptions, self.lines, fields=["W", "lr", "net", "cnst"])
+        for row, line in enumerate(self.lines):
+            report = ExampleOptions.validate(line)
+            with self.subTest(line=line):
+                self.assertEqual(report.ok, row not in dict(errors))
+                if report.ok:
+                    o = ExampleOptions(**report.values)
+                    self.assertEqual({k: c[row] for k, c in columns.items()}, {k: getattr(o, k) for k in columns})
+
+    def test_encoding(self):
+        columns, _ = OptionParser.parse_columns(ExampleOptions, self.lines, fields=["W", "net"], use_numpy=False)
+        self.assertEqual(list(columns), ["W", "net"])
+        self.assertEqual(columns["W"].values, array('q', [5, 3, 0, 3, 0, -4]))
+        self.assertEqual(columns["W"].nulls, array('B', [0, 0, 1, 0, 1, 0]))
+        self.assertEqual(columns["net"].categories, ["net1", "net2"])
+        self.assertEqual(columns["net"].codes, array('i', [0, 1, -1, 0, 0, 1]))
+
+    def test_other_fields_are_not_checked(self):
+        columns, errors = OptionParser.parse_columns(ExampleOptions, ["-W x --net net2", "--unknown 1"], fields=["net"])
+        self.assertEqual(columns["net"].to_list(), ["net2", None])
+        self.assertEqual([row for row, _ in errors], [1])
+
+        with self.assertRaises(OptionsError):
+            OptionParser.parse_columns(ExampleOptions, self.lines, fields=["X"])
+
+    def test_suboptions_are_checked(self):
+        columns, errors = OptionParser.parse_columns(ExampleOptions, ["--method B1", "--method 'MethodB(bint=x)'"],
+                                                     fields=["method"])
+        self.assertEqual(columns["method"].to_list(), [None, None])
+        self.assertEqual([(row, [path for path, _ in row_errors]) for row, row_errors in errors],
+                         [(0, ["method"]), (1, ["method.bint"])])
+
+    def test_suboption_names_as_in_options_strings(self):
+        lines = ["--method A1", "--method 'MethodA(abool=True,aint=1)'", "--method 'MethodA(aint=1)'",
+                 "--method2 'MethodB(bint=2)'", "--method2 MethodB", "--method 'MethodB(bint=8)' --method2 'MethodB(bint=3)'"]
+        with mock.patch("options.CANONICAL_CACHE_SIZE", 2):
+            columns, errors = OptionParser.parse_columns(ExampleOptions, lines, fields=["method", "method2"], use_numpy=False)
+        self.assertEqual(errors, [])
+        self.assertEqual(columns["method"].to_list(), ["A1", "A1", "MethodA", None, None, "MethodB"])
+        self.assertEqual(columns["method2"].to_list(), ["MethodB"] * len(lines))
+
+    def test_int_out_of_int64_range(self):
+        lines = ["-W 5", "--lr 2", "-W 99999999999999999999 --lr 3", "-W -5"]
+        columns, errors = OptionParser.parse_columns(ExampleOptions, lines, fields=["W", "lr"], use_numpy=False)
+        self.assertEqual(errors, [])
+        self.assertEqual(columns["W"].to_list(), [5, 3, 99999999999999999999, -5])
+        self.assertEqual(columns["W"].to_list(), [ExampleOptions.parse_args(line).W for line in lines])
+        self.assertEqual(columns["lr"].to_list(), [0.5, 2.0, 3.0, 0.5])
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+    def test_numpy(self):
+        columns, _ = OptionParser.parse_columns(ExampleOptions, self.lines)
+        self.assertEqual(columns["W"].values.dtype.name, "int64")
+        self.assertEqual(columns["lr"].values.dtype.name, "float64")
+        self.assertEqual(columns["test"].values.dtype.name, "bool")
+        self.assertEqual(columns["W"].nulls.tolist(), [False, False, True, False, True, False])
+        self.assertEqual(columns["net"].codes.tolist(), [0, 1, -1, 0, 0, 1])
+        self.assertEqual(columns["W"].to_list(), [5, 3, None, 3, None, -4])
+
+
+if __name__ == '__main__':
+    unittest.main()
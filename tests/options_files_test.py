@@ -0,0 +1,307 @@
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from tests.test_utils import TestOptionsBase
+
+from options import ConfigFileWatcher, OptionParser, OptionsError, OptionsFile, option, OptionsBase, variant, dump_many, parse_line
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+
+class MethodB(OptionsBase):
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true")
+    W: int = option("-W", default=3)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    method: MethodA|MethodB = option()
+
+
+class TestFilesBase(TestOptionsBase):
+    def write_lines(self, lines):
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class TestParseFileParallel(TestFilesBase):
+    def test_results_in_input_order(self):
+        lines = [str(ExampleOptions(W=i, test=i % 2 == 0, method=MethodA(aint=i) if i % 3 else MethodB(bint=i)))
+                 for i in range(200)]
+        path = self.write_lines(lines)
+
+        for workers, chunk_bytes in [(1, 1 << 20), (1, 100), (3, 500)]:
+            with self.subTest(workers=workers, chunk_bytes=chunk_bytes):
+                results = OptionParser.parse_file_parallel(ExampleOptions, path, workers=workers, chunk_bytes=chunk_bytes)
+                self.assertEqual(len(results), len(lines))
+                for line, (options, errors) in zip(lines, results):
+                    self.assertEqual(errors, [])
+                    self.assertEqual(options, ExampleOptions.parse_args(line))
+
+    def test_line_errors_are_preserved(self):
+        path = self.write_lines(["-W 1", "-W x", "--net net3 --method A1", "", "--method 'MethodA(aint=y)'"])
+
+        results = OptionParser.parse_file_parallel(ExampleOptions, path, workers=2, chunk_bytes=8)
+        self.assertEqual([options for options, _ in results],
+                         [ExampleOptions(W=1), None, None, ExampleOptions(), None])
+        self.assertEqual([[path for path, _ in errors] for _, errors in results],
+                         [[], ["W"], ["net"], [], ["method.aint"]])
+
+    def test_same_as_parse_args(self):
+        lines = ["--W=4", "--te", "-W 5 extra", "--net=net2 -W 1", "-t False --test", "-W 1 -W 2"]
+        path = self.write_lines(lines + ["-h", "--W=x"])
+
+        with self.assertNoLogs("options"):
+            results = OptionParser.parse_file_parallel(ExampleOptions, path, workers=1)
+        self.assertEqual([options for options, _ in results[:6]], [ExampleOptions.parse_args(line) for line in lines])
+        self.assertEqual([options for options, _ in results[6:]], [None, None])
+        self.assertTrue(all(errors for _, errors in results[6:]))
+        self.assertEqual(OptionsError.log_level, logging.ERROR)
+
+    def test_other_threads_log_during_fallback(self):
+        started, done = threading.Event(), threading.Event()
+        parse_opts = OptionParser.parse_opts
+
+        def slow_parse_opts(*args, **kwargs):
+            started.set()
+            done.wait(5)
+            return parse_opts(*args, **kwargs)
+
+        with mock.patch.object(OptionParser, "parse_opts", slow_parse_opts):
+            thread = threading.Thread(target=parse_line, args=(ExampleOptions, "--W=x"))
+            thread.start()
+            self.addCleanup(thread.join)
+            self.addCleanup(done.set)
+            started.wait(5)
+            with self.assertLogs("options", level=logging.ERROR):
+                with self.assertRaises(OptionsError):
+                    ExampleOptions(W="bad")
+
+
+class TestOptionsFile(TestFilesBase):
+    lines = [str(ExampleOptions(W=i, method=MethodA(aint=i))) for i in range(50)]
+
+    def open_file(self, path):
+        f = OptionsFile(ExampleOptions, path)
+        self.addCleanup(f.close)
+        self.addCleanup(lambda: os.path.exists(f.index_path) and os.remove(f.index_path))
+        return f
+
+    def test_random_access(self):
+        f = self.open_file(self.write_lines(self.lines))
+        self.assertEqual(len(f), 50)
+        self.assertEqual(f[7], ExampleOptions.parse_args(self.lines[7]))
+        self.assertEqual(f[-1].W, 49)
+        self.assertEqual([o.W for o in f[10:20:3]], [10, 13, 16, 19])
+        self.assertEqual(f.get_line(0), self.lines[0])
+        with self.assertRaises(IndexError):
+            f[50]
+        self.assertTrue(os.path.exists(f.index_path))
+
+    def test_lines_are_parsed_natively(self):
+        f = self.open_file(self.write_lines(self.lines[:3] + ["-W 1 -W 2"]))
+        with mock.patch("options.OptionsArgumentParser.parse_args", side_effect=AssertionError("argparse used")):
+            self.assertEqual(f[:3], [ExampleOptions.parse_args(line) for line in self.lines[:3]])
+        self.assertEqual(f[3], ExampleOptions.parse_args("-W 1 -W 2"))
+
+    def test_append(self):
+        path = self.write_lines(self.lines[:10])
+        f = self.open_file(path)
+        self.assertEqual(len(f), 10)
+
+        with open(path, 'a') as out:
+            out.write("\n".join(self.lines[10:20]) + "\n" + "-W 100")
+        f.refresh()
+        self.assertEqual(len(f), 21)
+        self.assertEqual(f[15].W, 15)
+        self.assertEqual(f[20].W, 100)
+
+        with open(path, 'a') as out:
+            out.write("0 --net net2\n-W 101\n")
+        f.refresh()
+        self.assertEqual(len(f), 22)
+        self.assertEqual((f[20].W, f[20].net, f[21].W), (1000, "net2", 101))
+
+    def test_index_is_reused(self):
+        path = self.write_lines(self.lines[:10])
+        self.open_file(path).close()
+
+        with open(path, 'a') as out:
+            out.write(self.lines[10] + "\n")
+        f = self.open_file(path)
+        self.assertEqual(len(f), 11)
+        self.assertEqual(f[10].W, 10)
+
+    def test_rewritten_file(self):
+        path = self.write_lines(self.lines[:10])
+        self.open_file(path).close()
+
+        with open(path, 'w') as out:
+            out.write("-W 1\n" * 20)
+        f = self.open_file(path)
+        self.assertEqual(len(f), 20)
+        self.assertEqual(f[19].W, 1)
+
+    def test_partial_index(self):
+        path = self.write_lines(self.lines + self.lines)
+        f = self.open_file(path)
+        f.close()
+        self.assertEqual([n for n in os.listdir(os.path.dirname(path)) if n.startswith(os.path.basename(f.index_path))],
+                         [os.path.basename(f.index_path)])
+
+        with open(f.index_path, 'r+b') as out:
+            out.truncate(os.path.getsize(f.index_path) - 60 * 8)
+        f = self.open_file(path)
+        self.assertEqual(len(f), 100)
+        self.assertEqual(f[50].W, 0)
+
+    def test_edited_in_place(self):
+        tail = "".join(line + "\n" for line in self.lines[:5])
+        path = self.write_lines(["-W 1", "--data abcdef"])
+        with open(path, 'a') as out:
+            out.write(tail)
+        self.open_file(path).close()
+        st = os.stat(path)
+
+        with open(path, 'r+') as out:
+            out.write("-W 1000\n--data abc\n" + tail)
+        self.assertEqual(os.path.getsize(path), st.st_size)
+        f = self.open_file(path)
+        self.assertEqual([f.get_line(0), f.get_line(1)], ["-W 1000", "--data abc"])
+
+        # the same size, mtime and inode, stale offsets are found when lines are read
+        with open(path, 'r+') as out:
+            out.write("-W 1\n--data abcdef\n" + tail)
+        os.utime(path, ns=(st.st_atime_ns, f.stat_key[1]))
+        f.close()
+        f = self.open_file(path)
+        self.assertEqual((f.stat_key[0], f.stat_key[2]), (st.st_size, st.st_ino))
+        self.assertEqual([f.get_line(0), f.get_line(1), f[2].W], ["-W 1", "--data abcdef", 0])
+
+
+class TestConfigFileWatcher(TestFilesBase):
+    lines = [f"-W {i}" for i in range(20)]
+
+    def rewrite(self, path, lines):
+        st = os.stat(path)
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))  # mtime may not change within its resolution
+
+    def load(self, lines):
+        path = self.write_lines(lines)
+        watcher = ConfigFileWatcher(ExampleOptions, path)
+        diff = watcher.reload()
+        self.assertEqual([(i, o.W) for i, o in diff.added], list(enumerate(range(len(lines)))))
+        return path, watcher
+
+    def test_unchanged(self):
+        path, watcher = self.load(self.lines)
+        self.assertFalse(watcher.changed())
+        self.assertFalse(watcher.reload())
+        self.assertFalse(watcher.reload(force=True))
+
+    def test_modified_lines_are_parsed(self):
+        path, watcher = self.load(self.lines)
+        before = watcher[:]
+        self.rewrite(path, self.lines[:5] + ["-W 105"] + self.lines[6:15] + ["-W   15"] + self.lines[16:])
+
+        diff = watcher.reload()
+        self.assertEqual([(i, old.W, new.W) for i, old, new in diff.modified], [(5, 5, 105)])
+        self.assertEqual((diff.added, diff.removed), ([], []))
+        self.assertEqual([o.W for o in watcher], [105 if i == 5 else i for i in range(20)])
+        for i in range(20):
+            if i not in (5, 15):
+                self.assertIs(watcher[i], before[i])
+
+    def test_added_removed_and_moved_lines(self):
+        path, watcher = self.load(self.lines)
+        before = watcher[:]
+        self.rewrite(path, ["-W 100"] + self.lines[:3] + self.lines[4:10] + self.lines[11:] + [self.lines[3]])
+
+        diff = watcher.reload()
+        self.assertEqual([(i, o.W) for i, o in diff.added], [(0, 100), (19, 3)])
+        self.assertEqual([(i, o.W) for i, o in diff.removed], [(3, 3), (10, 10)])
+        self.assertEqual(diff.modified, [])
+        self.assertIs(watcher[19], before[3])
+        self.assertIs(watcher[1], before[0])
+        self.assertEqual(len(watcher), 20)
+
+    def test_errors(self):
+        path, watcher = self.load(self.lines[:3])
+        self.rewrite(path, ["-W 0", "-W x", "-W 2", "--net net3"])
+
+        diff = watcher.reload()
+        self.assertEqual([(i, old.W, new) for i, old, new in diff.modified], [(1, 1, None)])
+        self.assertEqual(diff.added, [(3, None)])
+        self.assertEqual([(i, [path for path, _ in errors]) for i, errors in diff.errors], [(1, ["W"]), (3, ["net"])])
+        self.assertEqual(watcher.configs[3][1], diff.errors[1][1])
+
+    def test_watch(self):
+        path, watcher = self.load(self.lines[:2])
+        self.rewrite(path, self.lines[:3])
+        diff = next(watcher.watch(interval=0))
+        self.assertEqual([(i, o.W) for i, o in diff.added], [(2, 2)])
+
+
+class CustomFormatOptions(ExampleOptions):
+    @staticmethod
+    def option_format(k, v):
+        return f"--{k}={v}"
+
+
+class CustomStrOptions(ExampleOptions):
+    def to_str(self, include_defaults=True):
+        return "custom"
+
+
+class TestWriter(TestOptionsBase):
+    options = [ExampleOptions(),
+               ExampleOptions(W=5, net=None, method=MethodA(abool=True, aint=1)),
+               ExampleOptions(test=True, method=MethodA(aint=1)),
+               ExampleOptions(W=0, method=MethodB(bint=None)),
+               CustomFormatOptions(W=2, method=MethodB()),
+               CustomStrOptions(W=2)]
+
+    def test_write_to_is_identical_to_str(self):
+        for o in self.options:
+            for include_defaults in [True, False]:
+                with self.subTest(o=str(o), include_defaults=include_defaults):
+                    fp = io.StringIO()
+                    o.write_to(fp, include_defaults=include_defaults)
+                    self.assertEqual(fp.getvalue(), o.to_str(include_defaults=include_defaults))
+
+    def test_dump_many(self):
+        for include_defaults in [True, False]:
+            with self.subTest(include_defaults=include_defaults):
+                fp = io.StringIO()
+                dump_many(self.options * 3, fp, include_defaults=include_defaults, batch_size=4)
+                self.assertEqual(fp.getvalue(), "".join(o.to_str(include_defaults) + "\n" for o in self.options * 3))
+
+    def test_dump_many_json(self):
+        fp = io.StringIO()
+        dump_many(self.options[:4], fp, format="json", include_defaults=False)
+        lines = [json.loads(line) for line in fp.getvalue().splitlines()]
+        self.assertEqual(lines, [{},
+                                 {"W": 5, "net": None, "method": "A1"},
+                                 {"test": True, "method": "'MethodA(abool=False,aint=1)'"},
+                                 {"W": 0, "method": "'MethodB(bint=None)'"}])
+
+        for line, o in zip(lines, self.options):
+            self.assertEqual(ExampleOptions.parse_args(" ".join(f"--{k} {v}" for k, v in line.items())), o)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+import sys
+import unittest
+from tests.test_utils import TestOptionsBase
+
+from options import OptionsError, option, OptionsBase, variant, SharedOptionsStore
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+    astr: str = option()
+
+class MethodB(OptionsBase):
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true")
+    W: int = option("-W", default=3)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    method: MethodA|MethodB = option()
+
+
+class CompactOptions(ExampleOptions):
+    pickle_omit_defaults = True
+
+
+class TestPickle(TestOptionsBase):
+    def test_round_trip(self):
+        for o in [ExampleOptions(),
+                  ExampleOptions(W=5, net="net2", method=MethodA(aint=2, astr="abc")),
+                  ExampleOptions(test=True, method=MethodB(bint=None)),
+                  CompactOptions(),
+                  CompactOptions(W=None, method=MethodB())]:
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                with self.subTest(o=str(o), protocol=protocol):
+                    restored = pickle.loads(pickle.dumps(o, protocol=protocol))
+                    self.assertEqual(restored, o)
+                    self.assertEqual(str(restored), str(o))
+
+    def test_fields_set_out_of_order(self):
+        class OutOfOrder(ExampleOptions):
+            def __init__(self, **kwargs):
+                self.W = kwargs.pop("W", 3)
+                super().__init__(**kwargs)
+
+        for cls in [OutOfOrder, type("CompactOutOfOrder", (OutOfOrder,), {"pickle_omit_defaults": True})]:
+            o = cls(W=5, net="net2")
+            with self.subTest(cls=cls.__name__):
+                self.assertNotEqual(list(vars(o)), list(cls.get_schema().fields))
+                fn, args = o.__reduce__()
+                self.assertEqual(vars(fn(*args)), vars(o))
+                self.assertEqual(vars(cls.from_field_values(o.get_field_values())), vars(o))
+
+    def test_copy(self):
+        o = ExampleOptions(W=5, method=MethodA(aint=2))
+        self.assertEqual(copy.copy(o), o)
+        deep = copy.deepcopy(o)
+        self.assertEqual(deep, o)
+        self.assertIsNot(deep.method, o.method)
+
+    def test_omit_defaults_is_smaller(self):
+        self.assertLess(len(pickle.dumps(CompactOptions(W=4))), len(pickle.dumps(ExampleOptions(W=4))))
+
+    def test_restored_options_are_checked_on_set(self):
+        o = pickle.loads(pickle.dumps(ExampleOptions()))
+        with self.assertRaisesRegex(OptionsError, "invalid choice"):
+            o.net = "net3"
+
+    def test_schema_mismatch(self):
+        original = ExampleOptions
+        data = pickle.dumps(original(W=5))
+
+        class ExampleOptions2(OptionsBase):
+            W: str = option("-W", default="3")
+
+        module = sys.modules[__name__]
+        ExampleOptions2.__qualname__ = "ExampleOptions"
+        setattr(module, "ExampleOptions", ExampleOptions2)
+        self.addCleanup(setattr, module, "ExampleOptions", original)
+
+        with self.assertRaisesRegex(OptionsError, "does not match its current fields"):
+            pickle.loads(data)
+
+
+def read_shared(name, index):
+    with SharedOptionsStore.attach(ExampleOptions, name) as store:
+        return store[index].W, store.get_options(index)
+
+
+class TestSharedOptionsStore(TestOptionsBase):
+    options = [ExampleOptions(),
+               ExampleOptions(W=2**70, net=None, method=MethodA(aint=2, astr="åbc")),
+               ExampleOptions(test=True, W=-5, method=MethodB(bint=None))]
+
+    def create_store(self, options):
+        store = SharedOptionsStore.create(ExampleOptions, options)
+        self.addCleanup(store.unlink)
+        self.addCleanup(store.close)
+        return store
+
+    def test_views(self):
+        store = self.create_store(self.options)
+        self.assertEqual(len(store), len(self.options))
+        for i, (view, o) in enumerate(zip(store, self.options)):
+            with self.subTest(o=str(o)):
+                self.assertEqual(view, o)
+                self.assertEqual(o, view)
+                self.assertNotEqual(o, store[(i + 1) % len(store)])
+                self.assertEqual(str(view), str(o))
+                for field in vars(o):
+                    self.assertEqual(getattr(view, field), getattr(o, field))
+        self.assertEqual(store[-1].method, MethodB(bint=None))
+
+        with self.assertRaises(IndexError):
+            store[3]
+        with self.assertRaises(AttributeError):
+            store[0].B
+        with self.assertRaisesRegex(OptionsError, "read-only"):
+            store[0].W = 1
+
+    def test_attach(self):
+        store = self.create_store(self.options)
+        with SharedOptionsStore.attach(ExampleOptions, store.name) as attached:
+            self.assertEqual(attached.get_options(1), self.options[1])
+
+        with self.assertRaisesRegex(OptionsError, "do not match"):
+            SharedOptionsStore.attach(MethodA, store.name)
+
+    def test_attach_in_workers(self):
+        store = self.create_store(self.options)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(read_shared, [store.name] * 3, range(3)))
+        self.assertEqual(results, [(o.W, o) for o in self.options])
+
+    def test_wrong_type(self):
+        with self.assertRaisesRegex(OptionsError, "can not be stored"):
+            SharedOptionsStore.create(ExampleOptions, [CompactOptions()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from tests.test_utils import TestOptionsBase
+
+from options import OptionsSummary, option, OptionsBase, variant
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+
+class MethodB(OptionsBase):
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true")
+    W: int = option("-W", default=3)
+    seed: int = option(default=0)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    method: MethodA|MethodB = option()
+
+
+class TestOptionsSummary(TestOptionsBase):
+    def test_varying_fields(self):
+        runs = [ExampleOptions(W=i % 3, seed=i, method=MethodA(abool=True, aint=1) if i % 2 else MethodB())
+                for i in range(100)]
+        summary = OptionsSummary(ExampleOptions).update(runs)
+
+        self.assertEqual(summary.count, 100)
+        self.assertEqual(summary.varying(), ["W", "seed", "method", "method.bint", "method.abool", "method.aint"])
+
+        fields = summary.as_dict(n=3)
+        self.assertEqual(fields["test"], {"count": 100, "constant": True, "distinct": 1, "top": [(False, 100)]})
+        self.assertEqual(fields["W"]["distinct"], 3)
+        self.assertEqual(fields["W"]["top"], [(0, 34), (1, 33), (2, 33)])
+        self.assertEqual(fields["method"]["top"], [("MethodB", 50), ("A1", 50)])
+        self.assertEqual(fields["method.aint"], {"count": 50, "constant": True, "distinct": 1, "top": [(1, 50)]})
+        self.assertEqual(fields["seed"]["distinct"], 100)
+
+    def test_strings(self):
+        summary = OptionsSummary(ExampleOptions)
+        summary.update(["-W 1 --method A1", "-W 2 --method 'MethodA(aint=2)'", str(ExampleOptions(W=2))])
+        self.assertEqual(summary.varying(), ["W", "method", "method.abool", "method.aint"])
+        self.assertEqual(summary.fields["method"].top(), [("A1", 1), ("MethodA", 1), (None, 1)])
+
+    def test_invalid_strings(self):
+        summary = OptionsSummary(ExampleOptions, top_capacity=2)
+        summary.update(["-W 1", "-W x", "--W=2 --seed 5", "--net net3", "-W y", "-W 3"])
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.invalid, 3)
+        self.assertEqual([(line, [path for path, _ in errors]) for line, errors in summary.errors],
+                         [("-W x", ["W"]), ("--net net3", ["net"])])
+        self.assertEqual(summary.fields["W"].distinct, 3)
+        self.assertEqual(summary.fields["seed"].top(), [(0, 2), (5, 1)])
+
+    def test_bounded_memory(self):
+        summary = OptionsSummary(ExampleOptions, top_capacity=8, sketch_size=64)
+        n = 20000
+        for i in range(n):
+            summary.add(ExampleOptions(seed=i, W=i % 4))
+
+        seed = summary.fields["seed"]
+        self.assertEqual(len(seed.counters), 8)
+        self.assertEqual(len(seed.sketch), 64)
+        self.assertLess(abs(seed.distinct - n) / n, 0.5)
+        self.assertEqual(summary.fields["W"].distinct, 4)
+        self.assertEqual(sorted(summary.fields["W"].top()), [(0, 5000), (1, 5000), (2, 5000), (3, 5000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,12 @@
 # for example:
 # quant$ python -m unittest tests.options_test.TestOptions.test_defaults -v
 
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
 from enum import Enum, auto
+import io
 import itertools
+import threading
 from typing import get_type_hints
 import unittest
 import itertools
@@ -424,5 +428,149 @@ class TestOptions(TestOptionsBase):
         self.check_options_fields(o, methodInA=MA(aint=None), methodInB=MC(cstr=None, bint=8))
 
 
+class Node(OptionsBase):
+    val: int = option(default=1)
+    child: "Node" = option()
+    other: "OtherNode" = option()
+
+class OtherNode(OptionsBase):
+    node: Node = option()
+    pos: int = option("pos", nargs="?")
+
+
+class FloatOptions(OptionsBase):
+    lr: float = option(default=0.1)
+    n: int = option(default=1)
+    data: str = option(default="MNIST")
+
+
+class TestNativeParse(unittest.TestCase):
+    def parse_results(self, optionsType, parsed_str):
+        """
+        Results of parsing with and without registered ArgumentParser, OptionsError if parsing fails.
+        """
+        argumentParser = OptionParser.create_argumentParser()
+        OptionParser.register_opts(argumentParser, optionsType)
+        results = []
+        for parse in [lambda: OptionParser.parse_opts(optionsType, argumentParser=argumentParser, options_str=parsed_str),
+                      lambda: optionsType.parse_args(parsed_str)]:
+            try:
+                results.append(parse())
+            except OptionsError:
+                results.append(OptionsError)
+        return results
+
+    def test_same_as_argparse(self):
+        log_level = OptionsError.log_level
+        OptionsError.log_level = None
+        self.addCleanup(setattr, OptionsError, "log_level", log_level)
+        for optionsType, parsed_str in [
+                *((ExampleOptions, s) for s in ["", "-W 4 -t", "--test False -c 33", "--cnst 42 --net net2 -k abc",
+                                                "-W -4 --method None", "-W 1 -W 2", "-t -t False",
+                                                "--method MethodA(aint=2,abool=True) --method2 MethodB(bbool=False)",
+                                                "--method3 MethodC(cstr=x)"]),
+                *((FloatOptions, s) for s in ["--lr -1e5", "--lr -inf", "--n -1_0", "--data -1e3", "--lr -1.", "--lr -.5",
+                                              "--lr -0.5 --n -3"])]:
+            with self.subTest(optionsType=optionsType.__name__, parsed_str=parsed_str):
+                expected, result = self.parse_results(optionsType, parsed_str)
+                self.assertEqual(result, expected)
+
+    def test_fallback(self):
+        self.assertIsNone(OptionParser.parse_native(ExampleOptions, ["--W=4"]))
+        self.assertIsNone(OptionParser.parse_native(ExampleOptions, ["--te"]))
+        self.assertIsNone(OptionParser.parse_native(ExampleOptions, ["-t", "-t", "False"]))
+        self.assertEqual(ExampleOptions.parse_args("--W=4 --te").W, 4)
+        with self.assertRaises(SystemExit), contextlib.redirect_stdout(io.StringIO()) as stdout:
+            ExampleOptions.parse_args("-h")
+        self.assertIn("Test only", stdout.getvalue())
+
+    def test_recursive_types(self):
+        self.assertEqual(Node.parse_args("--val 3 --child Node(val=4)").child.val, 4)
+        self.assertFalse(Node.get_schema().native_parsable)
+        self.assertTrue(Node.get_schema().fields_native_parsable)
+
+    def test_lazy_variants_help(self):
+        @variant("B1", bint=1)
+        class MethodD(OptionsBase):
+            bint: int = option()
+
+        class HelpOptions(OptionsBase):
+            method: MethodD = option(help="method ")
+
+        argumentParser = OptionParser.create_argumentParser()
+        OptionParser.register_opts(argumentParser, HelpOptions)
+        OptionParser.register_opts(OptionParser.create_argumentParser(), HelpOptions)
+        self.assertEqual(HelpOptions.method[1], {"help": "method "})
+        self.assertIn("method B1 {'bint': 1}", argumentParser.format_help())
+        self.assertEqual(argumentParser.format_help().count("B1"), 1)
+
+
+class TestThreads(unittest.TestCase):
+    def test_concurrent_first_use(self):
+        @variant("D1", bint=1)
+        class MethodD(OptionsBase):
+            bint: int = option()
+
+        class ThreadOptions(OptionsBase):
+            test: bool = option('-t', action="store_true")
+            W: int = option("-W", default=3)
+            method: MethodD = option(help="method ")
+
+        parser = OptionParser(ThreadOptions)
+        barrier = threading.Barrier(8)
+
+        def use(i):
+            barrier.wait()
+            schema = ThreadOptions.get_schema()
+            options = ThreadOptions.parse_args(f"-W {i} -t --method D1")
+            return schema, str(options), parser.argumentParser.format_help()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(use, range(8)))
+
+        self.assertEqual(len({id(schema) for schema, _, _ in results}), 1)
+        self.assertEqual([s for _, s, _ in results], [f"--test True --W {i} --method D1" for i in range(8)])
+        self.assertTrue(all(help_str.count("D1") == 1 for _, _, help_str in results))
+        self.assertEqual(ThreadOptions.method[1], {"help": "method "})
+
+
+class TestParserStats(unittest.TestCase):
+    def test_profile(self):
+        ExampleOptions.parse_args("")
+        with OptionParser.profile():
+            for _ in range(3):
+                ExampleOptions.parse_args("-W 4 --method2 MethodB(bint=3)")
+        stats = OptionParser.stats()
+
+        for phase in ["tokenization", "native parse"]:
+            self.assertEqual(stats["counts"][phase], 3, msg=phase)
+            self.assertGreaterEqual(stats["seconds"][phase], 0)
+        self.assertNotIn("argparse construction", stats["counts"])
+        self.assertNotIn("get_type_hints", stats["counts"])
+        self.assertNotIn("schema cache miss", stats["counts"])
+        self.assertGreater(stats["counts"]["schema cache hit"], 0)
+
+    def test_profile_argparse(self):
+        ExampleOptions.parse_args("")
+        with OptionParser.profile():
+            for _ in range(3):
+                ExampleOptions.parse_args("--W=4 --method2 MethodB(bint=3)")
+        stats = OptionParser.stats()
+
+        for phase in ["argparse construction", "process_arguments", "argparse parse_args",
+                      "get_all_names reconciliation", "__setattr__ validation"]:
+            self.assertEqual(stats["counts"][phase], 3, msg=phase)
+            self.assertGreaterEqual(stats["seconds"][phase], 0)
+        self.assertEqual(stats["counts"]["native parse"], 3)  # suboptions
+        self.assertEqual(stats["counts"]["tokenization"], 6)  # 3 options and 3 suboptions
+        self.assertEqual(stats["counts"]["suboptionWrapper"], 3)
+
+    def test_disabled_by_default(self):
+        with OptionParser.profile():
+            pass
+        ExampleOptions.parse_args("-W 4")
+        self.assertEqual(OptionParser.stats(), {"counts": {}, "seconds": {}})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
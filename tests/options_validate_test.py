@@ -0,0 +1,162 @@
+import logging
+import unittest
+from unittest import mock
+from tests.test_utils import TestOptionsBase
+
+from options import OptionParser, OptionsError, option, OptionsBase, variant
+
+
+@variant("A1", abool=True, aint=1)
+class MethodA(OptionsBase):
+    abool: bool = option(action="store_true")
+    aint: int = option()
+    astr: str = option()
+
+class MethodB(OptionsBase):
+    bbool: bool = option(action="store_false")
+    bint: int = option(default=8)
+
+
+class ExampleOptions(OptionsBase):
+    test: bool = option('-t', action="store_true", help="Test only")
+    W: int = option("-W", default=3)
+    net: str = option(default="net1", choices=['net1', 'net2'])
+    cnst: int = option("-c", action='store_const', const=42)
+    method: MethodA|MethodB = option()
+
+
+class TestValidate(TestOptionsBase):
+    def setUp(self):
+        self.log_level = OptionsError.log_level
+        OptionsError.log_level = None
+
+    def tearDown(self):
+        OptionsError.log_level = self.log_level
+
+    def test_valid_string(self):
+        report = ExampleOptions.validate("-W 5 -t --net net2 -c --method 'MethodA(aint=2,astr=abc)'")
+        self.assertTrue(report.ok)
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.values, {"W": 5, "test": True, "net": "net2", "cnst": 42,
+                                         "method": MethodA(aint=2, astr="abc")})
+
+    def test_valid_string_action_values(self):
+        for parsed_str, expected in [
+            ("-t False --cnst 33", {"test": False, "cnst": 33}),
+            ("--test True -c 42", {"test": True, "cnst": 42}),
+            ("--method None -W -4", {"method": None, "W": -4}),
+            ("--method A1", {"method": MethodA(abool=True, aint=1)}),
+        ]:
+            with self.subTest(parsed_str=parsed_str):
+                report = ExampleOptions.validate(parsed_str)
+                self.assertTrue(report)
+                self.assertEqual(report.values, expected)
+
+    def test_all_errors_are_collected(self):
+        report = ExampleOptions.validate("-W abc --net net3 --unknown 1 -t maybe --method 'MethodA(aint=x,nope=1)'")
+        self.assertFalse(report)
+        self.assertEqual([path for path, _ in report.errors],
+                         ["W", "net", "--unknown", "1", "test", "method.aint", "method.--nope", "method.1"])
+        self.assertEqual(report.values, {})
+
+    def test_mapping(self):
+        report = ExampleOptions.validate({"W": 4, "net": "net2", "method": MethodB(bint=2)})
+        self.assertTrue(report.ok)
+
+        report = ExampleOptions.validate({"W": "4", "net": "net5", "B": 1, "method": MethodA()})
+        self.assertEqual([path for path, _ in report.errors], ["W", "net", "B"])
+        self.assertEqual(report.values, {"method": MethodA()})
+
+        with self.assertRaisesRegex(OptionsError, "Validation of ExampleOptions failed"):
+            report.raise_if_errors()
+
+    def test_validate_does_not_log(self):
+        OptionsError.log_level = logging.ERROR
+        with self.assertNoLogs('options', level=logging.DEBUG):
+            ExampleOptions.validate("-W abc --net net3")
+            ExampleOptions.validate("-t maybe")
+
+    def test_invalid_variants(self):
+        class MethodX(OptionsBase):
+            aint: int = option()
+
+        class BadVariantOptions(OptionsBase):
+            method: MethodX = option()
+
+        variant("X", aint="bad")(MethodX)
+        OptionsError.log_level = logging.ERROR
+        with self.assertNoLogs('options', level=logging.DEBUG):
+            report = BadVariantOptions.validate("--method X")
+            columns, errors = OptionParser.parse_columns(BadVariantOptions, ["--method X", "--method 'MethodX(aint=1)'"])
+        self.assertEqual([path for path, _ in report.errors], ["method"])
+        self.assertIn("Constraints check failed for MethodX field 'aint'", report.errors[0][1])
+        self.assertEqual(columns["method"].to_list(), [None, None])
+        self.assertEqual(errors, [(0, report.errors), (1, report.errors)])
+
+        OptionsError.log_level = None
+        with self.assertRaisesRegex(OptionsError, "Validation of BadVariantOptions failed"):
+            BadVariantOptions.canonicalize("--method X")
+
+    def test_error_logging_is_configurable(self):
+        OptionsError.log_level = logging.ERROR
+        with self.assertLogs('options', level=logging.ERROR) as logs:
+            with self.assertRaises(OptionsError):
+                ExampleOptions(W="abc")
+        self.assertEqual(len(logs.output), 1)
+
+        OptionsError.log_level = None
+        with self.assertNoLogs('options', level=logging.DEBUG):
+            with self.assertRaises(OptionsError):
+                ExampleOptions(W="abc")
+
+
+class TestCanonicalize(TestOptionsBase):
+    def setUp(self):
+        self.log_level = OptionsError.log_level
+        OptionsError.log_level = None
+
+    def tearDown(self):
+        OptionsError.log_level = self.log_level
+
+    def test_equivalent_spellings(self):
+        for spellings in [
+            ["-W 5 -t", "--W 5 --test", "--test True -W 5", "-t -W 5 --net net1"],
+            ["--method A1", "--method 'MethodA(abool=True,aint=1)'", "--method MethodA(aint=1,abool=True)", "--method A1 -W 3"],
+            ["-c", "--cnst 42", "-c 42"],
+            ["", "-W 3", "--method None", "-t False"],
+        ]:
+            with self.subTest(spellings=spellings):
+                self.assertEqual(len({ExampleOptions.canonicalize(s) for s in spellings}), 1)
+
+    def test_same_as_str_wo_defaults(self):
+        for options_str in ["-W -4 --net net2", "-c 7 -t", "--method 'MethodA(aint=2,astr=abc)'", "--method MethodA",
+                            "--method 'MethodB(bint=8)'", "--method 'MethodB(bbool=False)'", "--method A1 -W 0",
+                            "-c 33 --cnst 42", "-t False --test", "--test -t None", "-W None -W 4", "--W=4 --te"]:
+            with self.subTest(options_str=options_str):
+                self.assertEqual(ExampleOptions.canonicalize(options_str), ExampleOptions.parse_args(options_str).str_wo_defaults)
+
+    def test_no_options_are_created(self):
+        with mock.patch.object(OptionsBase, "__init__", side_effect=AssertionError("options created")):
+            self.assertEqual(ExampleOptions.canonicalize("--method 'MethodA(abool=True,aint=1)' -W 4"),
+                             "--W 4 --method 'A1(astr=None)'")
+
+    def test_variants_added_later(self):
+        class MethodD(OptionsBase):
+            dint: int = option()
+
+        class LaterOptions(OptionsBase):
+            method: MethodD = option()
+
+        self.assertEqual(LaterOptions.canonicalize("--method 'MethodD(dint=1)'"), "--method 'MethodD(dint=1)'")
+        variant("D1", dint=1)(MethodD)
+        self.assertEqual(LaterOptions.canonicalize("--method 'MethodD(dint=1)'"), "--method D1")
+
+    def test_invalid(self):
+        with self.assertRaisesRegex(OptionsError, "Validation of ExampleOptions failed"):
+            ExampleOptions.canonicalize("-W x")
+        with self.assertRaises(OptionsError):
+            ExampleOptions.canonicalize("--method 'MethodA(nope=1)'")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -99,4 +99,48 @@ class TestVariants(TestOptionsBase):
 
                 if len(expected_opts_in_str) >1 :
                     expected_str_pieces += [',']*(len(expected_opts_in_str)-1)
-                self.check_string_is_made_of(s, no_spaces=True, *expected_str_pieces)
\ No newline at end of file
+                self.check_string_is_made_of(s, no_spaces=True, *expected_str_pieces)
+
+    def test_variants_are_not_inherited(self):
+        @variant("C1", bint=1)
+        class MethodC(MethodB):
+            pass
+
+        self.assertEqual(list(MethodC.get_variants()), ["C1"])
+        self.assertEqual(list(MethodB.get_variants()), ["B2", "B1"])
+        self.assertEqual(MethodC(bint=3, bbool=True).as_variant, "'MethodC(bbool=True,bint=3)'")  # not B2
+
+    def test_metadata_is_read_only(self):
+        with self.assertRaises(TypeError):
+            MethodA.get_variants()["A4"] = {}
+        with self.assertRaises(TypeError):
+            MethodA.get_variants()["A3"]["aint"] = 5
+        with self.assertRaises(TypeError):
+            ExampleOptions2.data[1]["help"] = "other"
+
+    def test_variants_are_checked_on_first_use(self):
+        @variant("D2", dint="not an int")
+        @variant("D1", dint=1)
+        class MethodD(OptionsBase):
+            dint: int = option()
+
+        with self.assertRaisesRegex(OptionsError, "field 'dint' and value 'not an int'"):
+            MethodD.get_variants()
+
+        @variant("E2", eint=2)
+        @variant("E1", eint=1)
+        class MethodE(OptionsBase):
+            eint: int = option()
+
+        self.assertEqual(MethodE(eint=2).as_variant, "E2")
+        self.assertEqual(list(MethodE.get_variants()), ["E1", "E2"])
+
+    def test_eager_check(self):
+        OptionsBase.check_variants_eagerly = True
+        self.addCleanup(setattr, OptionsBase, "check_variants_eagerly", False)
+
+        with self.assertRaisesRegex(OptionsError, "field 'dint' and value 'not an int'"):
+            @variant("D1", dint="not an int")
+            class MethodD(OptionsBase):
+                dint: int = option()
+